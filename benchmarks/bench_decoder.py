@@ -0,0 +1,30 @@
+"""Benchmark of PacketDecoder on mixed PD/FFT streams.
+
+Usage: python benchmarks/bench_decoder.py
+"""
+import time
+from dvl.packets import PacketDecoder
+from sample_data import mixed_stream
+
+def run(data: bytes, chunk_size: int, repeat: int = 3) -> float:
+    """Returns best throughput in MB/s and number of packets decoded when data
+    are fed in chunk_size pieces.
+    """
+    best = None
+    for _ in range(repeat):
+        decoder = PacketDecoder()
+        count = 0
+        start = time.perf_counter()
+        for i in range(0, len(data), chunk_size):
+            count += len(decoder.parse_bytes(data[i:i+chunk_size]))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(data) / best / 1e6, count
+
+if __name__ == "__main__":
+    for (name, fft_every) in (("PD only", 0), ("PD + FFT", 50)):
+        DATA = mixed_stream(2000, fft_every)
+        for CHUNK in (64, 4096):
+            (RATE, PACKETS) = run(DATA, CHUNK)
+            print("{0:10s} chunk {1:5d}: {2:8.2f} MB/s ({3} packets, {4} bytes)".format(
+                name, CHUNK, RATE, PACKETS, len(DATA)))
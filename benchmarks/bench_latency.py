@@ -0,0 +1,72 @@
+"""Benchmark of ping-to-callback latency through SerialPort and Communicator.
+
+PD packets are written to a pseudo terminal (POSIX only) and the time until
+the registered data callback runs is measured.
+
+Usage: python benchmarks/bench_latency.py
+"""
+import os
+import pty
+import random
+import statistics
+import threading
+import time
+import tty
+from dvl.commands import Communicator
+from dvl.packets import AppLayerIdType
+from dvl.util import SerialPort
+from sample_data import frame, pd_payload
+
+def run(count: int = 200, interval: float = 0.02) -> list:
+    """Returns list of latencies in ms for count PD packets sent about every
+    interval seconds (with random jitter so sending is not in phase with the reader).
+    """
+    (master, slave) = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    port = SerialPort(os.ttyname(slave), 115200)
+    com = Communicator(port)
+    received = threading.Event()
+    latencies = []
+    sent = [0.0]
+
+    def on_data(_output_data, _obj):
+        latencies.append((time.perf_counter() - sent[0]) * 1000)
+        received.set()
+
+    com.register_ondata_callback(on_data, None)
+    port.__enter__()
+    data = frame(AppLayerIdType.DATA_PD, pd_payload())
+    try:
+        for _ in range(count):
+            received.clear()
+            time.sleep(interval + random.uniform(0, interval))
+            sent[0] = time.perf_counter()
+            os.write(master, data)
+            received.wait(1)
+    finally:
+        port.close()
+        os.close(master)
+        os.close(slave)
+    return latencies
+
+def cpu_idle(duration: float = 2.0) -> float:
+    """Returns CPU time in ms used by an open idle port during duration seconds.
+    """
+    (master, slave) = pty.openpty()
+    port = SerialPort(os.ttyname(slave), 115200)
+    port.__enter__()
+    start = time.process_time()
+    time.sleep(duration)
+    used = (time.process_time() - start) * 1000
+    port.close()
+    os.close(master)
+    os.close(slave)
+    return used
+
+if __name__ == "__main__":
+    LATENCIES = sorted(run())
+    print("packets {0}: median {1:.3f} ms, p99 {2:.3f} ms, max {3:.3f} ms".format(
+        len(LATENCIES), statistics.median(LATENCIES),
+        LATENCIES[int(len(LATENCIES) * 0.99) - 1], LATENCIES[-1]))
+    print("idle CPU time over 2 s: {0:.1f} ms".format(cpu_idle()))
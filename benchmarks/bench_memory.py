@@ -0,0 +1,22 @@
+"""Memory used by decoded pings kept in memory.
+
+Usage: python benchmarks/bench_memory.py
+"""
+import tracemalloc
+from dvl.system import OutputData
+from sample_data import pd_payload
+
+def bytes_per_ping(count: int = 20000) -> float:
+    """Returns average number of bytes allocated per kept OutputData object.
+    """
+    payloads = [pd_payload(i) for i in range(count)]
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    pings = [OutputData(payload) for payload in payloads]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del pings
+    return used / count
+
+if __name__ == "__main__":
+    print("OutputData: {0:.0f} bytes per ping".format(bytes_per_ping()))
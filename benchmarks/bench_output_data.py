@@ -0,0 +1,20 @@
+"""Microbenchmark of OutputData decoding (PD 0x11 structure).
+
+Usage: python benchmarks/bench_output_data.py
+"""
+import timeit
+from dvl.system import OutputData
+from sample_data import pd_payload
+
+def decodes_per_second(payload, number: int = 50000, repeat: int = 5) -> float:
+    """Returns best rate of OutputData decodes per second.
+    """
+    timer = timeit.Timer(lambda: OutputData(payload))
+    best = min(timer.repeat(repeat, number))
+    return number / best
+
+if __name__ == "__main__":
+    PAYLOAD = pd_payload()
+    for (NAME, ARR) in (("bytes", PAYLOAD), ("bytearray", bytearray(PAYLOAD)),
+                        ("memoryview", memoryview(PAYLOAD))):
+        print("{0:10s}: {1:10.0f} decodes/s".format(NAME, decodes_per_second(ARR)))
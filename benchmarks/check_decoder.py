@@ -0,0 +1,74 @@
+"""Fuzz check of PacketDecoder on corrupted mixed PD/FFT streams.
+
+Frames are corrupted by flipping one byte and random garbage is inserted
+between frames.  A flipped byte always breaks the checksum, so the decoder
+must return exactly the frames that were left intact, in order, no matter
+how the stream is split into chunks.
+
+Usage: python benchmarks/check_decoder.py [trials]
+"""
+import random
+import sys
+from dvl.packets import AppLayerIdType, PacketDecoder
+from sample_data import frame, pd_payload, fft_payload
+
+def corrupted_stream(seed: int, count: int = 60, fft_every: int = 20,
+                     corrupt: float = 0.3) -> (bytes, list):
+    """Creates stream of PD and FFT frames with corrupted frames and garbage.
+
+    Returns
+    -------
+    (bytes, list)
+        Stream and list of frames that were not corrupted.
+    """
+    rnd = random.Random(seed)
+    fft_frame = frame(AppLayerIdType.FFT_DATA, fft_payload(seed))
+    stream = bytearray()
+    intact = []
+    for i in range(count):
+        if i % fft_every == 0:
+            pkt = bytearray(fft_frame)
+        else:
+            pkt = bytearray(frame(AppLayerIdType.DATA_PD, pd_payload(rnd.randrange(1000))))
+        if rnd.random() < corrupt:
+            pkt[rnd.randrange(len(pkt))] ^= 0xFF
+        else:
+            intact.append(bytes(pkt))
+        if rnd.random() < corrupt:
+            stream += bytes(rnd.randrange(256) for _ in range(rnd.randrange(20)))
+        stream += pkt
+    return (bytes(stream), intact)
+
+def decode(data: bytes, chunk_sizes: list, zero_copy: bool = False) -> list:
+    """Feeds data to new decoder in chunks, returns encoded decoded packets.
+    """
+    decoder = PacketDecoder(zero_copy)
+    packets = []
+    pos = 0
+    index = 0
+    while pos < len(data):
+        size = chunk_sizes[index % len(chunk_sizes)]
+        packets += [bytes(pkt.encode()) for pkt in decoder.parse_bytes(data[pos:pos+size])]
+        pos += size
+        index += 1
+    return packets
+
+def check(trials: int) -> int:
+    """Runs trials, returns number of failed trials.
+    """
+    failed = 0
+    for seed in range(trials):
+        (data, intact) = corrupted_stream(seed)
+        rnd = random.Random(seed)
+        chunk_sizes = [rnd.choice([1, 7, 64, 1000, 4096, 40000]) for _ in range(16)]
+        for zero_copy in (False, True):
+            if decode(data, chunk_sizes, zero_copy) != intact:
+                failed += 1
+                print("seed {0} zero_copy {1}: decoded packets differ".format(seed, zero_copy))
+    return failed
+
+if __name__ == "__main__":
+    TRIALS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    FAILED = check(TRIALS)
+    print("{0} trials, {1} failed".format(TRIALS, FAILED))
+    sys.exit(1 if FAILED else 0)
@@ -0,0 +1,67 @@
+"""Synthetic Wayfinder data used by the benchmarks.
+"""
+import math
+import random
+import struct
+from dvl.packets import AppLayerPacket, AppLayerIdType, PhysicalLayerPacket, calc_checksum
+from dvl.system import FftData
+
+PD_SIZE = 87
+"""Size of PD (0x11) output data structure."""
+
+FFT_LEN = 1024
+"""Number of FFT samples per beam."""
+
+def pd_payload(seed: int = 0) -> bytes:
+    """Creates PD (0x11) output data structure with pseudo random values.
+    """
+    rnd = random.Random(seed)
+    arr = bytearray(PD_SIZE)
+    arr[0] = 0x30
+    arr[1] = 0x11
+    struct.pack_into("<I", arr, 2, PD_SIZE)
+    arr[6:12] = bytes([76, 0, 1, 0, 2, 3])
+    arr[12:18] = bytes([21, 5, 17, 12, 30, 45])
+    struct.pack_into("<HB", arr, 18, rnd.randrange(1000), 3)
+    values = [rnd.uniform(-2.0, 2.0) for _ in range(4)]
+    values += [rnd.uniform(1.0, 50.0) for _ in range(5)]
+    if rnd.random() < 0.1:
+        values[0] = math.nan
+    struct.pack_into("<9ff", arr, 21, *values, 1500.0)
+    struct.pack_into("<HBBfff", arr, 61, 0, 0, 0, 12.0, 24.0, 1.5)
+    arr[77:83] = b"123456"
+    checksum = calc_checksum(arr[0:-2])
+    arr[-2] = checksum & 0x00FF
+    arr[-1] = (checksum & 0xFF00) >> 8
+    return bytes(arr)
+
+def fft_payload(seed: int = 0) -> bytes:
+    """Creates FFT test data with pseudo random samples.
+    """
+    rnd = random.Random(seed)
+    arr = bytearray(FftData._SIZE) # pylint: disable=protected-access
+    struct.pack_into("<10I", arr, 0, 0, len(arr), 32768, FFT_LEN, 10000, 1, 15, 1,
+                     614400, 153600)
+    samples = [rnd.randrange(-10000, 10000) for _ in range(FFT_LEN * 4 * 2)]
+    struct.pack_into("<{}i".format(len(samples)), arr, 40, *samples)
+    return bytes(arr)
+
+def frame(pkt_id: AppLayerIdType, payload: bytes) -> bytes:
+    """Wraps payload into encoded physical layer packet.
+    """
+    al_pkt = AppLayerPacket()
+    al_pkt.create_from_payload(pkt_id, payload)
+    return PhysicalLayerPacket(al_pkt).encode()
+
+def mixed_stream(count: int, fft_every: int = 50) -> bytes:
+    """Creates stream of PD packets with FFT packet inserted every fft_every packets.
+    """
+    pd_frames = [frame(AppLayerIdType.DATA_PD, pd_payload(i)) for i in range(16)]
+    fft_frame = frame(AppLayerIdType.FFT_DATA, fft_payload())
+    out = bytearray()
+    for i in range(count):
+        if fft_every and i % fft_every == fft_every - 1:
+            out += fft_frame
+        else:
+            out += pd_frames[i % len(pd_frames)]
+    return bytes(out)
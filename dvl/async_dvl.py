@@ -0,0 +1,578 @@
+"""Contains AsyncDvl class to connect to Wayfinder from asyncio applications.
+"""
+import asyncio
+import datetime
+import os
+import struct
+import threading
+import serial
+from dvl.packets import AppLayerPacket, AppLayerIdType, PhysicalLayerPacket, PacketDecoder
+from dvl.commands import CommandIdType, ResponseStatusType, check_response, _get_cmd_frame, \
+    COMMAND_TIMEOUT_SEC, LONG_COMMAND_TIMEOUT
+from dvl.system import SystemInfo, SystemComponents, SystemFeatures, SystemSetup, \
+    SystemTests, DateTime, FftTest, FftData, OutputData
+
+class AsyncDvl():
+    """Class to connect to Wayfinder from asyncio applications.
+
+    Commands are coroutines and output data are received with an async
+    iterator.  On POSIX the port is watched by the event loop, so several
+    sensors can be driven by one loop without a thread per port; elsewhere
+    a reader thread passes received bytes to the loop.
+
+    Parameters
+    ----------
+    zero_copy : bool
+        If True received packets are decoded without copying their payloads
+        (see dvl.packets.PacketDecoder).
+    """
+    #pylint: disable=too-many-public-methods
+    #pylint: disable=too-many-instance-attributes
+    _READ_TIMEOUT = 0.1
+    _MAX_OUTPUT_DATA = 100
+
+    def __init__(self, zero_copy=False):
+        self._port = None
+        self._loop = None
+        self._reader_thread = None
+        self._run = False
+        self._decoder = PacketDecoder(zero_copy)
+        self._command_lock = None
+        self._response = None
+        self._writable = None
+        self._expected_cmd = None
+        self._fft = None
+        self._subscribers = []
+        self._system_tests = SystemTests()
+        self._system_setup = SystemSetup()
+        self._system_info = SystemInfo()
+        self._system_components = SystemComponents()
+        self._system_features = SystemFeatures()
+        self._fft_data = FftData(None)
+        self.baudrate = 115200
+        """Serial port baud rate."""
+        self.last_err = ResponseStatusType.SUCCESS
+        """Last response from the system as dvl.commands.ResponseStatusType."""
+        self.time_diff = 0
+        """Time different between system time and PC time."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.disconnect()
+
+    @property
+    def system_info(self) -> SystemInfo:
+        """After successful call to get_system results are stored in here."""
+        return self._system_info
+
+    @property
+    def system_components(self) -> SystemComponents:
+        """After successful call to get_components results are stored in here."""
+        return self._system_components
+
+    @property
+    def system_setup(self) -> SystemSetup:
+        """After successful call to get_setup results are stored in here."""
+        return self._system_setup
+
+    @property
+    def system_tests(self) -> SystemTests:
+        """After successful call to get_tests results are stored in here."""
+        return self._system_tests
+
+    @property
+    def system_features(self) -> SystemFeatures:
+        """After successful call to get_features results are stored in here."""
+        return self._system_features
+
+    @property
+    def fft_data(self) -> FftData:
+        """After successful call to get_fft_test results are stored in here."""
+        return self._fft_data
+
+    @property
+    def decoder(self) -> PacketDecoder:
+        """Packet decoder, gives access to discarded bytes and resynchronisation counters."""
+        return self._decoder
+
+    async def connect(self, com: str, baud_rate: int = 115200) -> bool:
+        """Connects to Wayfinder DVL.
+
+        Parameters
+        ----------
+        com : str
+            String that represents COM port to be opened, for example "COM1".
+        baud_rate : int
+            Baud rate to use when opening the port.
+
+        Returns
+        -------
+        bool
+            True if port is opened, False otherwise.
+        """
+        self.disconnect()
+        self._system_tests = SystemTests()
+        self._system_setup = SystemSetup()
+        self._system_info = SystemInfo()
+        self._system_components = SystemComponents()
+        self._system_features = SystemFeatures()
+        self._fft_data = FftData(None)
+        self.last_err = ResponseStatusType.SUCCESS
+        if not self._open(com, baud_rate):
+            self.last_err = ResponseStatusType.CANNOT_OPEN_PORT
+            return False
+        # Check if we can communicate with Wayfinder
+        if not await self.get_system():
+            self.disconnect()
+            return False
+        return True
+
+    def disconnect(self):
+        """Disconnects from Wayfinder DVL.  Pending command fails, output data
+        iterators end.
+        """
+        if self._port is None:
+            return
+        self._run = False
+        if self._reader_thread is None:
+            self._loop.remove_reader(self._port.fileno())
+            self._loop.remove_writer(self._port.fileno())
+        else:
+            try:
+                self._port.cancel_read()
+            except (AttributeError, serial.SerialException, OSError):
+                pass
+            self._reader_thread.join(2)
+            self._reader_thread = None
+        self._port.close()
+        self._port = None
+        # Fail the future the pending command waits for
+        pending = self._response if self._writable is None else self._writable
+        if pending is not None and not pending.done():
+            pending.set_exception(serial.SerialException("Port closed"))
+        if self._fft is not None and not self._fft.done():
+            self._fft.set_result(None)
+        for queue in self._subscribers:
+            _put_latest(queue, None)
+
+    def is_connected(self) -> bool:
+        """Checks if system is connected.
+
+        Returns
+        -------
+        bool
+            True if system is connected, False otherwise.
+        """
+        return self._port is not None
+
+    async def iter_output_data(self, max_items: int = _MAX_OUTPUT_DATA):
+        """Async iterator of received output data, ends on disconnect.
+
+        Each iterator keeps at most max_items data, the oldest are dropped
+        when the consumer falls behind::
+
+            async for output_data in dvl.iter_output_data():
+                ...
+        """
+        queue = asyncio.Queue(max_items)
+        self._subscribers.append(queue)
+        try:
+            while self._port is not None:
+                output_data = await queue.get()
+                if output_data is None:
+                    break
+                yield output_data
+        finally:
+            self._subscribers.remove(queue)
+
+    async def send_and_wait_for_response(self, packet: AppLayerPacket, \
+            expected_cmd: CommandIdType, timeout: float = COMMAND_TIMEOUT_SEC) -> AppLayerPacket:
+        """Sends packet and waits for response to expected command.
+
+        Returns
+        -------
+        AppLayerPacket
+            Response or None on timeout.
+        """
+        return await self._send_frame_and_wait(PhysicalLayerPacket(packet).encode(),
+                                               expected_cmd, timeout)
+
+    async def send_cmd(self, cmd: CommandIdType, timeout: float = COMMAND_TIMEOUT_SEC) \
+            -> (ResponseStatusType, AppLayerPacket):
+        """Sends command without parameters and waits for response.
+        """
+        response = await self._send_frame_and_wait(_get_cmd_frame(cmd), cmd, timeout)
+        return (check_response(response, cmd), response)
+
+    async def get_time(self) -> datetime:
+        """Gets system time.
+
+        Returns
+        -------
+        datetime
+            Time of the system if successful, None otherwise.
+        """
+        (self.last_err, response) = await self.send_cmd(CommandIdType.GET_TIME)
+        if self.last_err.value == ResponseStatusType.SUCCESS.value:
+            date_time = DateTime.decode(response)
+            if date_time is not None:
+                self.time_diff = date_time - datetime.datetime.now()
+            return date_time
+        return None
+
+    async def set_time(self, date_time: datetime) -> bool:
+        """Sets system time.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        cmd_id = CommandIdType.SET_TIME
+        if await self._set(DateTime.encode(date_time, cmd_id.value), cmd_id):
+            await self.get_time()
+            return True
+        return False
+
+    async def enter_command_mode(self) -> bool:
+        """Enters command mode (stops pinging).
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        (self.last_err, _) = await self.send_cmd(CommandIdType.ENTER_CMD_MODE,
+                                                 LONG_COMMAND_TIMEOUT)
+        return self.last_err.value == ResponseStatusType.SUCCESS.value
+
+    async def exit_command_mode(self) -> bool:
+        """Exits command mode (starts pinging).
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        (self.last_err, _) = await self.send_cmd(CommandIdType.EXIT_CMD_MODE)
+        return self.last_err.value == ResponseStatusType.SUCCESS.value
+
+    async def send_software_trigger(self) -> bool:
+        """Sends software trigger if software trigger is on.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        (self.last_err, _) = await self.send_cmd(CommandIdType.SOFTWARE_TRIGGER)
+        return self.last_err.value == ResponseStatusType.SUCCESS.value
+
+    async def reset_to_defaults(self) -> bool:
+        """Resets to factory defaults.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        (self.last_err, _) = await self.send_cmd(CommandIdType.RESET_TO_DEFAULTS)
+        return self.last_err.value == ResponseStatusType.SUCCESS.value
+
+    async def set_speed_of_sound(self, value: float) -> bool:
+        """Sets speed of sound value.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        cmd_id = CommandIdType.SET_SPEED_OF_SOUND
+        arr = bytearray(8)
+        struct.pack_into("I", arr, 0, cmd_id.value)
+        struct.pack_into("f", arr, 4, value)
+        al_pkt = AppLayerPacket()
+        al_pkt.create_from_payload(AppLayerIdType.CMD_BIN, arr)
+        return await self._set(al_pkt, cmd_id)
+
+    async def get_tests(self) -> bool:
+        """Performs and gets system tests results.  The results are in system_tests.
+        It is required to send enter_command_mode() before using this command.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        tests = await self._get(CommandIdType.GET_TESTS, SystemTests, LONG_COMMAND_TIMEOUT)
+        self._system_tests = tests if tests is not None else SystemTests()
+        return tests is not None
+
+    async def get_features(self) -> bool:
+        """Gets system features.  The results are in system_features.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        features = await self._get(CommandIdType.GET_FEATURES, SystemFeatures)
+        self._system_features = features if features is not None else SystemFeatures()
+        return features is not None
+
+    async def set_system_features(self, feature_code: bytearray) -> bool:
+        """Set system features.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        cmd_id = CommandIdType.SET_FEATURES
+        return await self._set(SystemFeatures.encode(feature_code, cmd_id.value), cmd_id)
+
+    async def get_setup(self) -> bool:
+        """Gets user setup.  The results are in system_setup.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        setup = await self._get(CommandIdType.GET_SETUP, SystemSetup)
+        self._system_setup = setup if setup is not None else SystemSetup()
+        return setup is not None
+
+    async def set_setup(self, setup: SystemSetup) -> bool:
+        """Sets user setup.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        cmd_id = CommandIdType.SET_SETUP
+        return await self._set(SystemSetup.encode(setup, cmd_id.value), cmd_id)
+
+    async def get_system(self) -> bool:
+        """Gets system information.  The results are in system_info.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        info = await self._get(CommandIdType.GET_SYSTEM, SystemInfo)
+        self._system_info = info if info is not None else SystemInfo()
+        return info is not None
+
+    async def get_components(self) -> bool:
+        """Gets hardware components information.  The results are in system_components.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        info = await self._get(CommandIdType.GET_COMPONENTS, SystemComponents)
+        self._system_components = info if info is not None else SystemComponents()
+        return info is not None
+
+    async def get_fft_test(self) -> bool:
+        """Gets FFT test.  The results are in fft_data.
+
+        Returns
+        -------
+        bool
+            True if successful, False otherwise.
+        """
+        cmd_id = CommandIdType.GET_FFT
+        mult = 4 if self.baudrate == 9600 else 1
+        self._fft = self._loop.create_future()
+        try:
+            response = await self.send_and_wait_for_response(
+                FftTest.encode(FftTest(), cmd_id.value), cmd_id, LONG_COMMAND_TIMEOUT * mult)
+            self.last_err = check_response(response, cmd_id)
+            fft = None
+            if self.last_err.value == ResponseStatusType.SUCCESS.value:
+                try:
+                    fft = await asyncio.wait_for(self._fft, COMMAND_TIMEOUT_SEC)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._fft = None
+        if fft is None:
+            self._fft_data = FftData(None)
+            return False
+        self._fft_data = fft
+        if fft.is_valid:
+            fft.process()
+        return True
+
+    async def _get(self, cmd: CommandIdType, cls, timeout: float = COMMAND_TIMEOUT_SEC):
+        """Sends get command and decodes response into new cls object, returns None on error.
+        """
+        (self.last_err, response) = await self.send_cmd(cmd, timeout)
+        if self.last_err.value != ResponseStatusType.SUCCESS.value:
+            return None
+        result = cls()
+        result.decode(response)
+        return result
+
+    async def _set(self, al_pkt: AppLayerPacket, cmd: CommandIdType) -> bool:
+        """Sends set command and checks response.
+        """
+        response = await self.send_and_wait_for_response(al_pkt, cmd)
+        self.last_err = check_response(response, cmd)
+        return self.last_err.value == ResponseStatusType.SUCCESS.value
+
+    async def _send_frame_and_wait(self, frame: bytes, expected_cmd: CommandIdType, \
+            timeout: float) -> AppLayerPacket:
+        """Sends encoded physical layer packet and waits for response with
+        expected command ID.  One command is outstanding at a time.
+        """
+        if self._port is None:
+            return None
+        async with self._command_lock:
+            if self._port is None:
+                return None
+            self._expected_cmd = expected_cmd.value
+            self._response = self._loop.create_future()
+            deadline = self._loop.time() + timeout
+            try:
+                await asyncio.wait_for(self._write(frame), timeout)
+                return await asyncio.wait_for(self._response,
+                                              max(0, deadline - self._loop.time()))
+            except (asyncio.TimeoutError, serial.SerialException, OSError):
+                return None
+            finally:
+                self._response = None
+                self._expected_cmd = None
+
+    async def _write(self, data: bytes):
+        """Writes data without blocking the event loop.  When the port does not
+        accept more data waits until it becomes writable.
+        """
+        if self._reader_thread is not None:
+            # No selectable file descriptor, blocking write runs in executor
+            await self._loop.run_in_executor(None, self._port.write, data)
+            return
+        fd = self._port.fileno()
+        view = memoryview(data)
+        while True:
+            if self._port is None:
+                raise serial.SerialException("Port closed")
+            try:
+                view = view[os.write(fd, view):]
+            except BlockingIOError:
+                pass
+            if not view:
+                return
+            self._writable = self._loop.create_future()
+            self._loop.add_writer(fd, _set_done, self._writable)
+            try:
+                await self._writable
+            finally:
+                self._writable = None
+                if self._port is not None:
+                    self._loop.remove_writer(fd)
+
+    def _open(self, com: str, baud_rate: int) -> bool:
+        """Opens port and starts watching it for received bytes.
+        """
+        if com.startswith("COM"):
+            com = "\\\\.\\"+ com
+        try:
+            self._port = serial.Serial(com, baud_rate, timeout=0)
+            self._port.writeTimeout = 1
+        except serial.SerialException:
+            self._port = None
+            return False
+        self.baudrate = baud_rate
+        self._loop = asyncio.get_running_loop()
+        self._command_lock = asyncio.Lock()
+        self._decoder.clear()
+        self._run = True
+        try:
+            self._loop.add_reader(self._port.fileno(), self._on_readable)
+        except (AttributeError, NotImplementedError, OSError):
+            # No selectable file descriptor (Windows), read in a thread instead
+            self._port.timeout = AsyncDvl._READ_TIMEOUT
+            self._reader_thread = threading.Thread(target=self._receive_listener,
+                                                   name="Wayfinder async serial thread")
+            self._reader_thread.daemon = True
+            self._reader_thread.start()
+        return True
+
+    def _on_readable(self):
+        """Event loop callback called when port has bytes to read.  Port that is
+        readable but returns nothing or fails (device disconnected) is closed.
+        """
+        try:
+            arr = self._port.read(max(1, self._port.in_waiting))
+        except (serial.SerialException, OSError):
+            arr = None
+        if not arr:
+            self.disconnect()
+            return
+        self._decode_packets(arr)
+
+    def _receive_listener(self):
+        """Thread function that reads bytes from port and passes them to the event loop.
+        Stops and disconnects on read error.
+        """
+        port = self._port
+        while self._run:
+            try:
+                arr = port.read(1)
+                if len(arr) > 0:
+                    arr += port.read(port.in_waiting)
+            except (serial.SerialException, OSError, TypeError):
+                if self._run:
+                    self._loop.call_soon_threadsafe(self._on_read_error, port)
+                break
+            if self._run and len(arr) > 0:
+                self._loop.call_soon_threadsafe(self._decode_packets, arr)
+
+    def _on_read_error(self, port: serial.Serial):
+        """Disconnects after reader thread of port failed, unless port was
+        already closed.
+        """
+        if self._port is port:
+            self.disconnect()
+
+    def _decode_packets(self, arr):
+        """Decodes received bytes, completes pending requests and feeds output data iterators.
+        """
+        for pkt in self._decoder.parse_bytes(arr):
+            al_pkt = pkt.payload
+            if al_pkt.pkt_id in (AppLayerIdType.CMD_BIN, AppLayerIdType.RSP_BIN):
+                response = self._response
+                if response is not None and not response.done() and \
+                   len(al_pkt.payload) >= 4 and \
+                   struct.unpack_from("I", al_pkt.payload, 0)[0] == self._expected_cmd:
+                    response.set_result(al_pkt.retain())
+            elif al_pkt.pkt_id == AppLayerIdType.DATA_PD:
+                if self._subscribers:
+                    output_data = OutputData(al_pkt.payload)
+                    if output_data.is_valid:
+                        for queue in self._subscribers:
+                            _put_latest(queue, output_data)
+            elif al_pkt.pkt_id == AppLayerIdType.FFT_DATA:
+                if self._fft is not None and not self._fft.done():
+                    self._fft.set_result(FftData(al_pkt.payload))
+
+def _set_done(future: asyncio.Future):
+    """Completes future unless it is already done.
+    """
+    if not future.done():
+        future.set_result(None)
+
+def _put_latest(queue: asyncio.Queue, item):
+    """Puts item into queue, drops the oldest item if queue is full.
+    """
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
@@ -0,0 +1,111 @@
+"""Contains persistent cache of Wayfinder system descriptors.
+"""
+import json
+import os
+import os.path
+import threading
+import time
+
+class DescriptorCache():
+    """Cache of command responses that change only with firmware or
+    configuration (components, features, setup), stored in a JSON file.
+
+    Entries are keyed by system ID and firmware version, so a firmware update
+    or another unit never gets stale data.
+
+    Parameters
+    ----------
+    file_name : str
+        Cache file, ~/.dvl/descriptors.json if None.
+    ttl : float
+        Time in seconds after which entries are not used.
+    refresh_age : float
+        Age in seconds after which entries are still used but refreshed in
+        the background.
+    """
+    _DEFAULT_FILE = os.path.join("~", ".dvl", "descriptors.json")
+
+    def __init__(self, file_name: str = None, ttl: float = 7 * 24 * 3600,
+                 refresh_age: float = 3600):
+        if file_name is None:
+            file_name = os.path.expanduser(DescriptorCache._DEFAULT_FILE)
+        self.file_name = file_name
+        """Cache file name."""
+        self.ttl = ttl
+        """Time in seconds after which entries are not used."""
+        self.refresh_age = refresh_age
+        """Age in seconds after which entries are refreshed in the background."""
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(system_info) -> str:
+        """Returns cache key for system, None if system info is not valid.
+        """
+        if system_info is None or not system_info.is_valid:
+            return None
+        return "{0:016X}_{1}".format(system_info.system_id, system_info.get_fw_version())
+
+    def get(self, key: str, name: str) -> (bytes, float):
+        """Returns cached response payload and its age in seconds.
+
+        Returns
+        -------
+        (bytes, float)
+            Payload and age, (None, None) if there is no entry or it is older than ttl.
+        """
+        with self._lock:
+            entry = self._load().get(key, {}).get(name)
+        if entry is None:
+            return (None, None)
+        age = time.time() - entry["time"]
+        if age > self.ttl or age < 0:
+            return (None, None)
+        return (bytes.fromhex(entry["payload"]), age)
+
+    def put(self, key: str, name: str, payload: bytes):
+        """Stores response payload and saves cache file.
+        """
+        with self._lock:
+            entries = self._load()
+            entries.setdefault(key, {})[name] = {"time": time.time(), "payload": bytes(payload).hex()}
+            self._save()
+
+    def invalidate(self, key: str = None, name: str = None):
+        """Removes entries: one entry, all entries of a system if name is None,
+        or everything if key is None.
+        """
+        with self._lock:
+            entries = self._load()
+            if key is None:
+                entries.clear()
+            elif name is None:
+                entries.pop(key, None)
+            else:
+                entries.get(key, {}).pop(name, None)
+            self._save()
+
+    def _load(self) -> dict:
+        """Reads cache file on first use.  Unreadable file is treated as empty cache.
+        """
+        if self._entries is None:
+            try:
+                with open(self.file_name, "r") as cache_file:
+                    self._entries = json.load(cache_file)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        """Writes cache file, replacing it only after it is fully written.
+        """
+        try:
+            folder = os.path.dirname(self.file_name)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp_name = self.file_name + ".tmp"
+            with open(tmp_name, "w") as cache_file:
+                json.dump(self._entries, cache_file)
+            os.replace(tmp_name, self.file_name)
+        except OSError:
+            pass
@@ -3,11 +3,15 @@
 from enum import Enum
 import datetime
 import struct
-from queue import Queue, Empty
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from time import perf_counter
+from queue import Empty
 from dvl.packets import PhysicalLayerPacket, AppLayerPacket, PacketDecoder, AppLayerIdType
-from dvl.util import DataLogger, SerialPort
+from dvl.util import DataLogger, SerialPort, BoundedQueue, PipelineStage
 from dvl.system import SystemInfo, SystemFeatures, SystemSetup, SystemTests,\
-   SystemComponents, SystemUpdate, DateTime, FftTest, OutputData, FftData
+   SystemComponents, SystemUpdate, DateTime, FftTest, OutputData, LazyOutputData, FftData
 
 class CommandIdType(Enum):
     """Enumerated type class that defines command IDs.
@@ -89,41 +93,306 @@ class ResponseErrorType(Enum):
     INVALID_DATETIME = 5
     """Invalid date/time."""
 
+class QueueType(Enum):
+    """Enumerated type class that defines Communicator receive queues.
+    """
+    CMD = 0
+    """Command responses."""
+    FFT = 1
+    """Decoded FFT data."""
+    STATUS = 2
+    """Status packets."""
+
+class CallbackModeType(Enum):
+    """Enumerated type class that defines how data callbacks are executed.
+    """
+    INLINE = 0
+    """Called directly by the thread that decodes (or dispatches) data."""
+    THREAD = 1
+    """Called by a dedicated thread of the callback, data are queued."""
+    POOL = 2
+    """Called by a thread of the pool shared by all pool callbacks, data are queued.
+    A callback is never called by two pool threads at the same time."""
+
+class _DataCallback():
+    """Registered data callback with its execution policy and statistics.
+    """
+    #pylint: disable=too-many-instance-attributes
+    #pylint: disable=too-many-arguments
+    def __init__(self, func, obj, lazy: bool, mode: CallbackModeType, max_items: int,
+                 drop_oldest: bool, pool: PipelineStage = None):
+        self.func = func
+        self.obj = obj
+        self.lazy = lazy
+        self.mode = mode
+        self.calls = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.max_time = 0.0
+        self._pool = pool
+        self._queue = BoundedQueue(max_items, 0, drop_oldest)
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._thread = None
+        self.start()
+
+    def submit(self, output_data):
+        """Calls or queues callback according to its mode.
+        """
+        if self.mode == CallbackModeType.INLINE:
+            self.run(output_data)
+        elif self._queue.put(output_data) or self._queue.drop_oldest:
+            if self._pool is not None:
+                self._schedule()
+
+    def _schedule(self):
+        """Queues callback for the pool unless it is already queued or running,
+        so at most one pool thread runs the callback at a time.
+        """
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._pool.put(self)
+
+    #pylint: disable=broad-except
+    def run(self, output_data):
+        """Calls callback, exceptions are printed and counted.
+        """
+        start = perf_counter()
+        failed = False
+        try:
+            self.func(output_data, self.obj)
+        except Exception as exception:
+            failed = True
+            print("Exception in callback function: {0}".format(exception))
+        elapsed = perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.busy_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+    def run_queued(self):
+        """Calls callback with queued data in order, used by the pool.
+
+        Data queued when the call starts are processed, if more data arrive
+        meanwhile the callback is queued for the pool again so that other pool
+        callbacks are not starved.
+        """
+        for _ in range(max(self._queue.qsize(), 1)):
+            try:
+                output_data = self._queue.get_nowait()
+            except Empty:
+                break
+            self.run(output_data)
+        with self._lock:
+            if self._queue.empty():
+                self._scheduled = False
+                return
+        self._pool.put(self)
+
+    def start(self):
+        """Starts dedicated thread of THREAD callback, if it is not running.
+        """
+        if self.mode != CallbackModeType.THREAD or self._thread is not None:
+            return
+        self._queue.reopen()
+        self._thread = threading.Thread(target=self._worker, name="Wayfinder callback")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops dedicated thread after queued data are processed.
+        """
+        self._queue.close()
+        if self._thread is not None:
+            self._thread.join(2)
+            self._thread = None
+
+    def get_stats(self) -> dict:
+        """Returns execution statistics.
+        """
+        with self._lock:
+            return {"name": getattr(self.func, "__name__", repr(self.func)),
+                    "mode": self.mode, "calls": self.calls, "errors": self.errors,
+                    "busy_time": self.busy_time, "max_time": self.max_time,
+                    "pending": self._queue.qsize(), "dropped": self._queue.dropped_items}
+
+    def _worker(self):
+        while True:
+            try:
+                output_data = self._queue.get()
+            except Empty:
+                break
+            self.run(output_data)
+
 class Communicator():
     """Class that implements binary communication layer.
+
+    Parameters
+    ----------
+    port : SerialPort
+        Port to use, new SerialPort is created if None.
+    zero_copy : bool
+        If True received packets are decoded without copying payloads out of
+        the receive buffer (see PacketDecoder).  Packets put into command and
+        status queues are retained, so they stay valid.
+    pipeline : bool
+        If True decoding and data callbacks run on their own threads, see start_pipeline.
     """
     #pylint: disable=too-many-instance-attributes
 
     _MAX_Q_SIZE = 1000
-
-    def __init__(self, port=None):
+    _CALLBACK_POOL_WORKERS = 2
+    _MAX_Q_BYTES = {
+        QueueType.CMD: 1 << 20,
+        QueueType.FFT: 8 << 20,
+        QueueType.STATUS: 1 << 20,
+    }
+
+    def __init__(self, port=None, zero_copy: bool = False, pipeline: bool = False):
         if port is None:
             self.port = SerialPort()
         else:
             self.port = port
         self.data_logger = DataLogger()
         self.all_data_logger = DataLogger()
-        self._decoder = PacketDecoder()
-        self._fft_queue = Queue(Communicator._MAX_Q_SIZE)
-        self._cmd_queue = Queue(Communicator._MAX_Q_SIZE)
-        self._status_queue = Queue(Communicator._MAX_Q_SIZE)
-        self.port.register_receive_callback(self.decode_packets)
+        self._decoder = PacketDecoder(zero_copy)
+        self._queues = {queue_type: BoundedQueue(Communicator._MAX_Q_SIZE, max_bytes)
+                        for (queue_type, max_bytes) in Communicator._MAX_Q_BYTES.items()}
+        self._fft_queue = self._queues[QueueType.FFT]
+        self._cmd_queue = self._queues[QueueType.CMD]
+        self._status_queue = self._queues[QueueType.STATUS]
+        self._decoder_stage = None
+        self._dispatch_stage = None
+        self.port.register_receive_callback(self._on_receive)
         self._ondata_callback = []
+        self._callback_pool = None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._output_data_class = OutputData
         self._cmd_count = 0
+        if pipeline:
+            self.start_pipeline()
 
     def __enter__(self):
         """Initializes serial port interface.
         """
+        self._start_stages()
         self.port.__enter__()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         """Cleans up serial port interface.
         """
-        self.port.__exit__(exc_type, exc_value, traceback)
+        self.close()
+
+    def open(self, com: str, baud_rate: int) -> bool:
+        """Opens serial port, pipeline, callback pool and THREAD callback
+        threads stopped by close are started again.
+
+        Parameters
+        ----------
+        com : str
+            String that represents COM port to be opened, for example "COM1".
+        baud_rate : int
+            Baud-rate to use when opening the port.
+
+        Returns
+        -------
+        bool
+            True if port is opened, False otherwise.
+        """
+        self._start_stages()
+        return self.port.open(com, baud_rate)
+
+    def close(self):
+        """Closes serial port and stops pipeline, callback pool and THREAD
+        callback threads.  Registered callbacks are kept, open starts their
+        threads again.
+        """
+        self.port.close()
+        for stage in (self._decoder_stage, self._dispatch_stage, self._callback_pool):
+            if stage is not None:
+                stage.stop()
+        for callback in self._ondata_callback:
+            callback.stop()
+
+    def _start_stages(self):
+        for callback in self._ondata_callback:
+            callback.start()
+        for stage in (self._callback_pool, self._dispatch_stage, self._decoder_stage):
+            if stage is not None:
+                stage.start()
+
+    @property
+    def decoder(self) -> PacketDecoder:
+        """Packet decoder, gives access to discarded bytes and resynchronisation counters."""
+        return self._decoder
+
+    def start_pipeline(self, dispatch_workers: int = 1, max_raw_bytes: int = 1 << 20,
+                       max_dispatch_items: int = 1000):
+        """Moves decoding and data callbacks off the serial thread.
+
+        The serial thread then only queues received bytes for the decoder stage,
+        the decoder stage queues output data for the dispatch stage which calls
+        data callbacks.  Slow callbacks therefore do not stop the port from
+        being drained.  When a stage queue is full the oldest items are dropped
+        and counted as overruns.
+
+        Parameters
+        ----------
+        dispatch_workers : int
+            Number of threads calling data callbacks.  With more than one thread
+            callbacks may be called out of order.
+        max_raw_bytes : int
+            Maximum number of received bytes waiting for decoding.
+        max_dispatch_items : int
+            Maximum number of output data waiting for callbacks.
+        """
+        if self._decoder_stage is not None:
+            return
+        self._dispatch_stage = PipelineStage("Wayfinder dispatch", self._dispatch,
+                                             dispatch_workers, max_dispatch_items)
+        self._dispatch_stage.start()
+        decoder_stage = PipelineStage("Wayfinder decoder", self.decode_packets, 1, 0,
+                                      max_raw_bytes)
+        decoder_stage.start()
+        self._decoder_stage = decoder_stage
+
+    def stop_pipeline(self):
+        """Stops pipeline started by start_pipeline, received data are again
+        decoded on the serial thread.  Data received while stopping may be lost.
+        """
+        if self._decoder_stage is None:
+            return
+        self._decoder_stage.stop()
+        self._decoder_stage = None
+        self._dispatch_stage.stop()
+        self._dispatch_stage = None
+
+    def get_pipeline_stats(self) -> dict:
+        """Returns queue depth, overrun and processing statistics of pipeline
+        stages ("decoder" and "dispatch"), empty if pipeline is not running.
+        """
+        decoder_stage = self._decoder_stage
+        dispatch_stage = self._dispatch_stage
+        if decoder_stage is None or dispatch_stage is None:
+            return {}
+        return {"decoder": decoder_stage.get_stats(), "dispatch": dispatch_stage.get_stats()}
+
+    def _on_receive(self, arr):
+        decoder_stage = self._decoder_stage
+        if decoder_stage is None:
+            self.decode_packets(arr)
+        else:
+            decoder_stage.put(bytes(arr), len(arr))
 
     def decode_packets(self, arr):
         """Decodes binary packets and puts them into queues.
+
+        arr may be a view of the port receive buffer, it is not kept after the call.
         """
         pl_packets = self._decoder.parse_bytes(arr)
         if self.all_data_logger.is_logging():
@@ -132,37 +401,33 @@ class Communicator():
             al_pkt = pkt.payload
             if al_pkt.pkt_id in (AppLayerIdType.CMD_BIN, AppLayerIdType.RSP_BIN):
                 #print(pkt)
-                if self._cmd_queue.qsize() >= Communicator._MAX_Q_SIZE:
-                    self._cmd_queue.get_nowait()
-                self._cmd_queue.put(al_pkt, block=False)
+                if not self._complete_request(al_pkt):
+                    self._cmd_queue.put(al_pkt.retain(), len(al_pkt.payload))
                 self._cmd_count += 1
                 #print("Got response {0}".format(self._cmd_count))
             elif al_pkt.pkt_id == AppLayerIdType.DATA_PD:
-                payload = al_pkt.get_payload()
-                output_data = OutputData(payload)
+                output_data = self._output_data_class(al_pkt.payload)
                 if output_data.is_valid:
                     self._call_back(output_data)
                     if self.data_logger.is_logging():
                         self.data_logger.write(pkt.encode())
             elif al_pkt.pkt_id == AppLayerIdType.FFT_DATA:
-                if self._fft_queue.qsize() >= Communicator._MAX_Q_SIZE:
-                    self._fft_queue.get_nowait()
-                fft_data = FftData(al_pkt.get_payload())
-                self._fft_queue.put(fft_data, block=False)
+                fft_data = FftData(al_pkt.payload)
+                size = sum(beam_data.signal.nbytes for beam_data in fft_data.data)
+                self._fft_queue.put(fft_data, size)
             elif al_pkt.pkt_id == AppLayerIdType.STATUS:
-                if self._status_queue.qsize() >= Communicator._MAX_Q_SIZE:
-                    self._status_queue.get_nowait()
-                self._status_queue.put(al_pkt, block=False)
+                self._status_queue.put(al_pkt.retain(), len(al_pkt.payload))
 
-    #pylint: disable=broad-except
     def _call_back(self, output_data):
-        try:
-            for callback in self._ondata_callback:
-                func = callback[0]
-                obj = callback[1]
-                func(output_data, obj)
-        except Exception as exception:
-            print("Exception in callback function: {0}".format(exception))
+        dispatch_stage = self._dispatch_stage
+        if dispatch_stage is None:
+            self._dispatch(output_data)
+        else:
+            dispatch_stage.put(output_data)
+
+    def _dispatch(self, output_data):
+        for callback in self._ondata_callback:
+            callback.submit(output_data)
 
     def send_packet(self, packet: PhysicalLayerPacket):
         """Sends physical layer packet to DVL.
@@ -172,30 +437,27 @@ class Communicator():
     def flush_fft_queue(self):
         """Flushes FFT data queue.
         """
-        while not self._fft_queue.empty():
-            self._fft_queue.get_nowait()
+        self._fft_queue.clear()
 
     def flush_cmd_queue(self):
         """Flushes command queue.
         """
-        while not self._cmd_queue.empty():
-            self._cmd_queue.get_nowait()
+        self._cmd_queue.clear()
 
     def flush_status_queue(self):
         """Flushes status queue.
         """
-        while not self._status_queue.empty():
-            self._status_queue.get_nowait()
+        self._status_queue.clear()
 
     def get_cmd_packet(self, time_out: int = 0) -> AppLayerPacket:
-        """Gets command response packet.
+        """Gets command response packet that did not match any pending request.
+
+        If time_out is 0 the function does not wait.  A timeout does not affect
+        the decoder, so packets being received are not lost.
         """
-        if time_out == 0 and self._cmd_queue.empty():
-            return None
         try:
-            return self._cmd_queue.get(block=True, timeout=time_out)
+            return self._cmd_queue.get(block=time_out > 0, timeout=time_out)
         except Empty:
-            self._decoder.clear()
             return None
 
     def get_fft_count(self):
@@ -224,6 +486,29 @@ class Communicator():
         except Empty:
             return None
 
+    def configure_queue(self, queue_type: QueueType, max_items: int, max_bytes: int,
+                        drop_oldest: bool = True):
+        """Sets limits of a receive queue.
+
+        Parameters
+        ----------
+        queue_type : QueueType
+            Queue to configure.
+        max_items : int
+            Maximum number of items, 0 for no limit.
+        max_bytes : int
+            Maximum total size of items in bytes, 0 for no limit.  Size of FFT data
+            is the size of decoded samples.
+        drop_oldest : bool
+            If True oldest items are dropped when queue is full, otherwise new items are dropped.
+        """
+        self._queues[queue_type].configure(max_items, max_bytes, drop_oldest)
+
+    def get_queue_stats(self, queue_type: QueueType) -> dict:
+        """Returns size, limits and drop counters of a receive queue.
+        """
+        return self._queues[queue_type].get_stats()
+
     def send_and_wait_for_response(self, packet: AppLayerPacket, \
             timeout: int = 0, debug: bool = False) -> AppLayerPacket:
         """Sends packet and waits for response.
@@ -231,24 +516,169 @@ class Communicator():
         pl_pkt = PhysicalLayerPacket(packet)
         if debug:
             print(pl_pkt)
+        [cmd_id] = struct.unpack_from("I", packet.payload, 0)
+        return self._send_frame_and_wait(pl_pkt.encode(), cmd_id, timeout)
+
+    def send_request(self, packet: AppLayerPacket, timeout: float = None) -> Future:
+        """Sends command packet without waiting for response.
+
+        The response is matched to the request by the command ID echoed in
+        its payload, so several requests can be in flight.  Requests with the
+        same command ID are answered in order.  Responses that match no
+        request go to the command queue (see get_cmd_packet).
+
+        Parameters
+        ----------
+        packet : AppLayerPacket
+            Command packet, payload starts with command ID.
+        timeout : float
+            Time to wait for response in seconds, COMMAND_TIMEOUT_SEC if None.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future with response AppLayerPacket, or None when timeout expires.
+        """
+        if timeout is None:
+            timeout = COMMAND_TIMEOUT_SEC
+        [cmd_id] = struct.unpack_from("I", packet.payload, 0)
+        future = self._send_frame_request(PhysicalLayerPacket(packet).encode(), cmd_id)
+        timer = threading.Timer(timeout, self._expire_request, (cmd_id, future))
+        timer.daemon = True
+        timer.start()
+        future.add_done_callback(lambda _: timer.cancel())
+        return future
+
+    def _send_frame_and_wait(self, frame: bytes, cmd_id: int, timeout: int) -> AppLayerPacket:
+        """Sends encoded physical layer packet and waits for response.
+
+        If timeout is negative response is not waited for and goes to command
+        queue, which is flushed before sending so only this response can be read.
+        """
+        if timeout < 0:
+            if self.all_data_logger.is_logging():
+                self.all_data_logger.write(bytearray(b"<Sent cmd>"))
+            self.flush_cmd_queue()
+            self.port.write(frame)
+            return None
+        future = self._send_frame_request(frame, cmd_id)
+        if not future.done():
+            try:
+                future.result(timeout)
+            except FutureTimeoutError:
+                self._expire_request(cmd_id, future)
+        return future.result()
+
+    def _send_frame_request(self, frame: bytes, cmd_id: int) -> Future:
+        """Registers request for response with cmd_id and sends encoded packet.
+
+        The request is a response slot: the receive path completes the future
+        directly and the waiting thread wakes up on its condition, no queue is
+        polled or flushed.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self._pending_lock:
+            self._pending.setdefault(cmd_id, deque()).append(future)
         if self.all_data_logger.is_logging():
             self.all_data_logger.write(bytearray(b"<Sent cmd>"))
-        self.flush_cmd_queue()
-        self.send_packet(pl_pkt)
-        if timeout >= 0:
-            response = self.get_cmd_packet(timeout)
-            return response
-        return None
-
-    def register_ondata_callback(self, func, obj):
+        self.port.write(frame)
+        return future
+
+    def _expire_request(self, cmd_id: int, future: Future):
+        """Completes request with None if it is still waiting for response.
+        """
+        with self._pending_lock:
+            pending = self._pending.get(cmd_id)
+            if pending is None or future not in pending:
+                return
+            pending.remove(future)
+            if not pending:
+                del self._pending[cmd_id]
+        future.set_result(None)
+
+    def _complete_request(self, al_pkt: AppLayerPacket) -> bool:
+        """Completes the oldest request waiting for response with the same
+        command ID, returns False if there is no such request.
+        """
+        if len(al_pkt.payload) < 4:
+            return False
+        [cmd_id] = struct.unpack_from("I", al_pkt.payload, 0)
+        with self._pending_lock:
+            pending = self._pending.get(cmd_id)
+            if not pending:
+                return False
+            future = pending.popleft()
+            if not pending:
+                del self._pending[cmd_id]
+        future.set_result(al_pkt.retain())
+        return True
+
+    def register_ondata_callback(self, func, obj, lazy: bool = False,
+                                 mode: CallbackModeType = CallbackModeType.INLINE,
+                                 max_items: int = 100, drop_oldest: bool = True):
         """Registers receive callback function.
-        """
-        self._ondata_callback.append((func, obj))
+
+        If lazy is True the callback accepts LazyOutputData.  Data are decoded
+        lazily only when all registered callbacks accept it.
+
+        Each callback is called separately, an exception in one callback does
+        not stop the others.
+
+        Parameters
+        ----------
+        func
+            Callback function func(output_data, obj).
+        obj : object
+            Object passed to the callback.
+        lazy : bool
+            If True the callback accepts LazyOutputData.
+        mode : CallbackModeType
+            Defines if the callback is called inline, by its own thread or by
+            the shared callback pool.
+        max_items : int
+            Maximum number of data queued for THREAD and POOL callbacks.
+        drop_oldest : bool
+            If True oldest queued data are dropped when the queue is full,
+            otherwise new data are dropped.
+        """
+        #pylint: disable=too-many-arguments
+        pool = None
+        if mode == CallbackModeType.POOL:
+            if self._callback_pool is None:
+                self._callback_pool = PipelineStage(
+                    "Wayfinder callback pool", lambda callback: callback.run_queued(),
+                    Communicator._CALLBACK_POOL_WORKERS, 0)
+                self._callback_pool.start()
+            pool = self._callback_pool
+        callback = _DataCallback(func, obj, lazy, mode, max_items, drop_oldest, pool)
+        self._ondata_callback = self._ondata_callback + [callback]
+        self._update_output_data_class()
 
     def unregister_all_callbacks(self):
-        """Unregisters all callback functions.
+        """Unregisters all callback functions.  Data already queued for THREAD
+        callbacks are processed before their threads stop.
         """
-        self._ondata_callback.clear()
+        callbacks = self._ondata_callback
+        self._ondata_callback = []
+        self._update_output_data_class()
+        for callback in callbacks:
+            callback.stop()
+        if self._callback_pool is not None:
+            self._callback_pool.stop()
+            self._callback_pool = None
+
+    def get_callback_stats(self) -> list:
+        """Returns list with execution statistics of each registered callback
+        (number of calls, errors, time spent, queued and dropped data).
+        """
+        return [callback.get_stats() for callback in self._ondata_callback]
+
+    def _update_output_data_class(self):
+        if self._ondata_callback and all(callback.lazy for callback in self._ondata_callback):
+            self._output_data_class = LazyOutputData
+        else:
+            self._output_data_class = OutputData
 
     def reset(self):
         """Resets queues and decoder.
@@ -267,8 +697,8 @@ LONG_COMMAND_TIMEOUT = 15
 class BinaryCommands(Communicator):
     """Binary commands interface.
     """
-    def __init__(self, port=None):
-        Communicator.__init__(self, port)
+    def __init__(self, port=None, zero_copy: bool = False, pipeline: bool = False):
+        Communicator.__init__(self, port, zero_copy, pipeline)
 
     def enter_command_mode(self) -> ResponseStatusType:
         """Enters command mode (stops pinging).
@@ -393,11 +823,16 @@ class BinaryCommands(Communicator):
             -> (ResponseStatusType, AppLayerPacket):
         """Sends command and waits for response.
         """
-        al_pkt = _create_cmd(cmd)
-        response = self.send_and_wait_for_response(al_pkt, timeout)
+        response = self._send_frame_and_wait(_get_cmd_frame(cmd), cmd.value, timeout)
         err = check_response(response, cmd)
         return (err, response)
 
+    def request_cmd(self, cmd: CommandIdType, timeout=COMMAND_TIMEOUT_SEC) -> Future:
+        """Sends command without parameters, returns future with response
+        (None on timeout), see send_request.
+        """
+        return self.send_request(_create_cmd(cmd), timeout)
+
     def get_fft_test(self):
         """Gets FFT samples.
         """
@@ -406,7 +841,9 @@ class BinaryCommands(Communicator):
         mult = 1
         if self.port.baudrate == 9600:
             mult = 4
-        self.reset()
+        # Response is matched by command ID, only stale FFT data would be taken
+        # for the result
+        self.flush_fft_queue()
         response = self.send_and_wait_for_response(al_pkt, LONG_COMMAND_TIMEOUT * mult)
         err = check_response(response, CommandIdType.GET_FFT)
 
@@ -436,8 +873,7 @@ class BinaryCommands(Communicator):
             -> (ResponseStatusType, AppLayerPacket):
         """Sends command without waiting for response.
         """
-        al_pkt = _create_cmd(cmd)
-        self.send_and_wait_for_response(al_pkt, -1)
+        self._send_frame_and_wait(_get_cmd_frame(cmd), cmd.value, -1)
 
 def _create_cmd(cmd: CommandIdType) -> AppLayerPacket:
     """Creates command as application layer packet.
@@ -448,6 +884,19 @@ def _create_cmd(cmd: CommandIdType) -> AppLayerPacket:
     al_pkt.create_from_payload(AppLayerIdType.CMD_BIN, payload)
     return al_pkt
 
+_CMD_FRAMES = {}
+
+def _get_cmd_frame(cmd: CommandIdType) -> bytes:
+    """Returns encoded physical layer packet for command without parameters.
+
+    Frames are encoded on first use and then reused for every send.
+    """
+    frame = _CMD_FRAMES.get(cmd)
+    if frame is None:
+        frame = PhysicalLayerPacket(_create_cmd(cmd)).encode()
+        _CMD_FRAMES[cmd] = frame
+    return frame
+
 def check_response(packet: AppLayerPacket, expected_cmd: CommandIdType) -> ResponseStatusType:
     """Checks command response.
     """
@@ -0,0 +1,92 @@
+"""Contains functions that find Wayfinder systems connected to serial ports.
+"""
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dvl.commands import BinaryCommands, CommandIdType, ResponseStatusType
+from dvl.system import SystemInfo, BaudRateType
+from dvl.util import SerialPort
+
+BAUD_RATES = {
+    BaudRateType.BAUD_115200: 115200,
+    BaudRateType.BAUD_9600: 9600,
+}
+"""Baud rates supported by Wayfinder, in the order they are probed."""
+
+PROBE_TIMEOUT_SEC = 0.5
+"""Time to wait for response to the identity probe."""
+
+_PORT_PATTERNS = ("/dev/ttyUSB*", "/dev/ttyACM*")
+
+def get_candidate_ports() -> list:
+    """Returns serial ports that may have Wayfinder connected: USB serial
+    devices on POSIX systems, all COM ports elsewhere.
+    """
+    if os.name == "posix":
+        ports = []
+        for pattern in _PORT_PATTERNS:
+            ports += sorted(glob.glob(pattern))
+        return ports
+    # pylint: disable=import-outside-toplevel
+    from serial.tools import list_ports
+    return [port.device for port in list_ports.comports()]
+
+def probe(com: str, baud_rates=None, timeout: float = PROBE_TIMEOUT_SEC):
+    """Probes one port for Wayfinder, baud rates are tried one after another.
+
+    Parameters
+    ----------
+    com : str
+        Port to probe.
+    baud_rates : list
+        Baud rates to try, all BAUD_RATES if None.
+    timeout : float
+        Time to wait for response at each baud rate in seconds.
+
+    Returns
+    -------
+    (str, int, SystemInfo)
+        Port, baud rate and system information, None if Wayfinder did not respond.
+    """
+    if baud_rates is None:
+        baud_rates = list(BAUD_RATES.values())
+    for baud_rate in baud_rates:
+        port = SerialPort(com, baud_rate)
+        if not port.open(com, baud_rate):
+            return None
+        try:
+            commands = BinaryCommands(port)
+            (err, response) = commands.send_cmd(CommandIdType.GET_SYSTEM, timeout)
+        finally:
+            port.close()
+        if err.value == ResponseStatusType.SUCCESS.value:
+            info = SystemInfo()
+            info.decode(response)
+            if info.is_valid:
+                return (com, baud_rate, info)
+    return None
+
+def discover(ports=None, baud_rates=None, timeout: float = PROBE_TIMEOUT_SEC) -> list:
+    """Finds Wayfinder systems by probing all ports at the same time.
+
+    Parameters
+    ----------
+    ports : list
+        Ports to probe, get_candidate_ports() if None.
+    baud_rates : list
+        Baud rates to try on each port, all BAUD_RATES if None.
+    timeout : float
+        Time to wait for response at each baud rate in seconds.
+
+    Returns
+    -------
+    list
+        (port, baud rate, SystemInfo) tuple for each Wayfinder found.
+    """
+    if ports is None:
+        ports = get_candidate_ports()
+    if not ports:
+        return []
+    with ThreadPoolExecutor(max_workers=len(ports)) as executor:
+        results = list(executor.map(lambda com: probe(com, baud_rates, timeout), ports))
+    return [result for result in results if result is not None]
@@ -1,20 +1,47 @@
 """Contains main Dvl class to connect to Wayfinder.
 """
 import datetime
+import threading
 from dvl.packets import AppLayerPacket
 from dvl.commands import BinaryCommands, check_response
 from dvl.system import SystemInfo, SystemComponents, SystemFeatures, SystemSetup, \
-    SystemTests, FftData
-from dvl.commands import ResponseStatusType, CommandIdType
+    SystemTests, FftData, DateTime
+from dvl.commands import ResponseStatusType, CommandIdType, CallbackModeType
+from dvl.cache import DescriptorCache
+from dvl.discovery import discover
 
 class Dvl():
     """Main class to connect to Wayfinder.
+
+    Parameters
+    ----------
+    com : str
+        String that represents COM port to be opened, for example "COM1".
+        If None the port is not opened.
+    baudrate : int
+        Baud rate to use when opening the port.
+    zero_copy : bool
+        If True received packets are decoded without copying their payloads
+        (see dvl.packets.PacketDecoder).
+    pipeline : bool
+        If True decoding and data callbacks run on their own threads instead
+        of the serial thread (see dvl.commands.Communicator.start_pipeline).
+    cache : DescriptorCache
+        If not None get_components, get_features and get_setup are served
+        from this cache after connect (see dvl.cache.DescriptorCache).
     """
     #pylint: disable=too-many-public-methods
     #pylint: disable=too-many-instance-attributes
 
-    def __init__(self, com=None, baudrate=115200):
-        self._commands = BinaryCommands()
+    #pylint: disable=too-many-arguments
+    def __init__(self, com=None, baudrate=115200, zero_copy=False, pipeline=False,
+                 cache: DescriptorCache = None):
+        self._commands = BinaryCommands(zero_copy=zero_copy, pipeline=pipeline)
+        self.cache = cache
+        """Descriptor cache, None if responses are not cached."""
+        self._refreshing = set()
+        self._cache_generation = 0
+        self._cache_lock = threading.Lock()
         self._system_tests = SystemTests()
         self._system_setup = SystemSetup()
         self._system_info = SystemInfo()
@@ -38,13 +65,13 @@ class Dvl():
     def __enter__(self):
         """Opens serial port on enter.
         """
-        self._commands.port.__enter__()
+        self._commands.__enter__()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         """Closes serial port on exit.
         """
-        self._commands.port.__exit__(exc_type, exc_value, traceback)
+        self._commands.__exit__(exc_type, exc_value, traceback)
 
     @property
     def system_info(self) -> SystemInfo:
@@ -102,7 +129,7 @@ class Dvl():
             name = "COM" + "_"
             self._commands.all_data_logger.open_file(self.working_folder, name, ".txt")
         self._commands.reset()
-        port_opened = self._commands.port.open(com, baud_rate)
+        port_opened = self._commands.open(com, baud_rate)
         self._is_connected = port_opened
         if port_opened:
             # Check if we can communicate with Wayfinder
@@ -113,12 +140,33 @@ class Dvl():
             self.last_err = ResponseStatusType.CANNOT_OPEN_PORT
         return self._is_connected
 
+    def auto_connect(self, ports=None) -> bool:
+        """Finds Wayfinder on serial ports (see dvl.discovery.discover) and
+        connects to the first one found.
+
+        Parameters
+        ----------
+        ports : list
+            Ports to search, USB serial ports if None.
+
+        Returns
+        -------
+        bool
+            True if Wayfinder was found and connected, False otherwise.
+        """
+        found = discover(ports)
+        if not found:
+            self.last_err = ResponseStatusType.NO_RESPONSE
+            return False
+        (com, baud_rate, _) = found[0]
+        return self.connect(com, baud_rate)
+
     def disconnect(self):
         """Disconnects from Wayfinder DVL.
         """
         self.stop_logging()
         self._commands.all_data_logger.close_file()
-        self._commands.port.__exit__(None, None, None)
+        self._commands.close()
         self._is_connected = False
 
     def is_connected(self) -> bool:
@@ -208,7 +256,10 @@ class Dvl():
             True if successful, False otherwise.
         """
         self.last_err = self._commands.reset_to_defaults()
-        return self.last_err.value == ResponseStatusType.SUCCESS.value
+        if self.last_err.value == ResponseStatusType.SUCCESS.value:
+            self._invalidate_cached()
+            return True
+        return False
 
     def set_speed_of_sound(self, value: float) -> bool:
         """Sets speed of sound value.
@@ -220,6 +271,7 @@ class Dvl():
         """
         self.last_err = self._commands.set_speed_of_sound(value)
         if self.last_err.value == ResponseStatusType.SUCCESS.value:
+            self._invalidate_cached(CommandIdType.GET_SETUP)
             return True
         return False
 
@@ -252,7 +304,10 @@ class Dvl():
         bool
             True if successful, False otherwise.
         """
-        (self.last_err, features) = self._commands.get_features()
+        if self.cache is not None:
+            (self.last_err, features) = self._get_cached(CommandIdType.GET_FEATURES, SystemFeatures)
+        else:
+            (self.last_err, features) = self._commands.get_features()
         if self.last_err.value == ResponseStatusType.SUCCESS.value:
             self._system_features = features
             return True
@@ -269,6 +324,7 @@ class Dvl():
         """
         self.last_err = self._commands.set_system_features(feature_code)
         if self.last_err.value == ResponseStatusType.SUCCESS.value:
+            self._invalidate_cached(CommandIdType.GET_FEATURES)
             return True
         return False
 
@@ -280,7 +336,10 @@ class Dvl():
         bool
             True if successful, False otherwise.
         """
-        (self.last_err, setup) = self._commands.get_setup()
+        if self.cache is not None:
+            (self.last_err, setup) = self._get_cached(CommandIdType.GET_SETUP, SystemSetup)
+        else:
+            (self.last_err, setup) = self._commands.get_setup()
         if self.last_err.value == ResponseStatusType.SUCCESS.value:
             self._system_setup = setup
             return True
@@ -296,7 +355,10 @@ class Dvl():
             True if successful, False otherwise.
         """
         self.last_err = self._commands.set_setup(setup)
-        return self.last_err.value == ResponseStatusType.SUCCESS.value
+        if self.last_err.value == ResponseStatusType.SUCCESS.value:
+            self._invalidate_cached(CommandIdType.GET_SETUP)
+            return True
+        return False
 
     def get_system(self) -> bool:
         """Gets system information.  The results are in system_info.
@@ -321,13 +383,164 @@ class Dvl():
         bool
             True if successful, False otherwise.
         """
-        (self.last_err, result) = self._commands.get_components()
+        if self.cache is not None:
+            (self.last_err, result) = self._get_cached(CommandIdType.GET_COMPONENTS, SystemComponents)
+        else:
+            (self.last_err, result) = self._commands.get_components()
         if self.last_err.value == ResponseStatusType.SUCCESS.value:
             self._system_components = result
             return True
         self._system_components = SystemComponents()
         return False
 
+    def get_all_info(self) -> bool:
+        """Gets system information, components, features, setup and time with
+        all requests sent at once instead of one after another.  The results
+        are in system_info, system_components, system_features, system_setup
+        and time_diff.  With cache components, features and setup are taken
+        from the cache when present (see get_setup).
+
+        Returns
+        -------
+        bool
+            True if all requests were successful, False otherwise.
+        """
+        self.last_err = ResponseStatusType.SUCCESS
+        generation = self._cache_generation
+        key = self._get_cache_key()
+        cached = {}
+        if key is not None:
+            for (cmd, cls) in _CACHED_STRUCTURES.items():
+                payload = self._get_cached_payload(key, cmd, cls)
+                if payload is not None:
+                    cached[cmd] = payload
+        results = self._request_all([cmd for cmd in _ALL_INFO_COMMANDS if cmd not in cached])
+        self._system_info = _decode(SystemInfo(), results.get(CommandIdType.GET_SYSTEM))
+        new_key = self._get_cache_key()
+        if cached and new_key != key:
+            # Cached entries belong to other system or firmware
+            results.update(self._request_all(list(cached)))
+            cached = {}
+        structures = {}
+        for (cmd, cls) in _CACHED_STRUCTURES.items():
+            structures[cmd] = cls()
+            if cmd in cached:
+                structures[cmd].decode_from_array(cached[cmd])
+            elif cmd in results:
+                structures[cmd].decode(results[cmd])
+                if new_key is not None:
+                    self._put_cached(new_key, cmd, results[cmd].get_payload(), generation)
+        self._system_components = structures[CommandIdType.GET_COMPONENTS]
+        self._system_features = structures[CommandIdType.GET_FEATURES]
+        self._system_setup = structures[CommandIdType.GET_SETUP]
+        if CommandIdType.GET_TIME in results:
+            date_time = DateTime.decode(results[CommandIdType.GET_TIME])
+            if date_time is not None:
+                self.time_diff = date_time - datetime.datetime.now()
+        return len(results) + len(cached) == len(_ALL_INFO_COMMANDS)
+
+    def _request_all(self, commands: list) -> dict:
+        """Sends all commands at once and waits for responses.  The first
+        error is stored in last_err.
+
+        Returns
+        -------
+        dict
+            Successful responses by command.
+        """
+        futures = [self._commands.request_cmd(cmd) for cmd in commands]
+        results = {}
+        for (cmd, future) in zip(commands, futures):
+            response = future.result()
+            err = check_response(response, cmd)
+            if err.value == ResponseStatusType.SUCCESS.value:
+                results[cmd] = response
+            elif self.last_err.value == ResponseStatusType.SUCCESS.value:
+                self.last_err = err
+        return results
+
+    def invalidate_cache(self):
+        """Removes cached descriptors of the connected system, they are read
+        from the system on next use.
+        """
+        self._invalidate_cached()
+
+    def _get_cache_key(self) -> str:
+        """Returns cache key of the connected system, None without cache.
+        """
+        if self.cache is None:
+            return None
+        return DescriptorCache.get_key(self._system_info)
+
+    def _get_cached(self, cmd: CommandIdType, cls):
+        """Returns (error, structure) from cache, or from the system when not cached.
+        """
+        key = self._get_cache_key()
+        if key is not None:
+            payload = self._get_cached_payload(key, cmd, cls)
+            if payload is not None:
+                result = cls()
+                result.decode_from_array(payload)
+                return (ResponseStatusType.SUCCESS, result)
+        return self._get_and_cache(key, cmd, cls)
+
+    def _get_cached_payload(self, key: str, cmd: CommandIdType, cls) -> bytes:
+        """Returns cached response payload, None if not cached.  Old entries
+        are refreshed in the background.
+        """
+        (payload, age) = self.cache.get(key, cmd.name)
+        if payload is not None and age > self.cache.refresh_age:
+            self._start_refresh(key, cmd, cls)
+        return payload
+
+    def _get_and_cache(self, key: str, cmd: CommandIdType, cls):
+        """Gets structure from the system and stores its response in cache.
+        """
+        generation = self._cache_generation
+        (err, response) = self._commands.send_cmd(cmd)
+        if err.value != ResponseStatusType.SUCCESS.value:
+            return (err, None)
+        result = cls()
+        result.decode(response)
+        if key is not None:
+            self._put_cached(key, cmd, response.get_payload(), generation)
+        return (err, result)
+
+    def _put_cached(self, key: str, cmd: CommandIdType, payload: bytes, generation: int):
+        """Stores response payload in cache unless cache was invalidated
+        since generation was read (response may be older than the change).
+        """
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                self.cache.put(key, cmd.name, payload)
+
+    def _start_refresh(self, key: str, cmd: CommandIdType, cls):
+        """Refreshes cached response in a background thread.
+        """
+        with self._cache_lock:
+            if cmd in self._refreshing:
+                return
+            self._refreshing.add(cmd)
+        def refresh():
+            try:
+                self._get_and_cache(key, cmd, cls)
+            finally:
+                with self._cache_lock:
+                    self._refreshing.discard(cmd)
+        thread = threading.Thread(target=refresh, name="Wayfinder cache refresh")
+        thread.daemon = True
+        thread.start()
+
+    def _invalidate_cached(self, cmd: CommandIdType = None):
+        """Removes cached response of cmd, or all cached responses of the
+        connected system if cmd is None.
+        """
+        key = self._get_cache_key()
+        if key is not None:
+            with self._cache_lock:
+                self._cache_generation += 1
+                self.cache.invalidate(key, None if cmd is None else cmd.name)
+
     def get_fft_test(self) -> bool:
         """Gets FFT test.  The results are in fft_data.
 
@@ -463,14 +676,36 @@ class Dvl():
         """
         return self._commands.data_logger.is_logging()
 
-    def register_ondata_callback(self, func, obj=None):
+    def register_ondata_callback(self, func, obj=None, lazy=False,
+                                 mode=CallbackModeType.INLINE, max_items=100, drop_oldest=True):
         """Registers on data received callback function.
 
         The callback function should be define as follows:
         def func(output_data: dvl.system.OutputData, obj):  where output_data are
         received by driver, and obj is any object.
+
+        If lazy is True the callback may receive dvl.system.LazyOutputData
+        which decodes fields only when they are read.  This is used when all
+        registered callbacks are lazy.
+
+        mode (dvl.commands.CallbackModeType) selects if the callback is called
+        inline, by its own thread or by a shared thread pool.  Queued callbacks
+        keep at most max_items data and drop the oldest (or newest if
+        drop_oldest is False) when they fall behind.
         """
-        self._commands.register_ondata_callback(func, obj)
+        #pylint: disable=too-many-arguments
+        self._commands.register_ondata_callback(func, obj, lazy, mode, max_items, drop_oldest)
+
+    def get_callback_stats(self) -> list:
+        """Returns execution statistics of registered callbacks.
+
+        Returns
+        -------
+        list
+            Dictionary for each callback with number of calls, errors, time
+            spent and queued and dropped data.
+        """
+        return self._commands.get_callback_stats()
 
     def unregister_all_callbacks(self):
         """Unregisters all callback functions.
@@ -482,8 +717,36 @@ class Dvl():
         """
         self._commands.reset()
 
+    def get_pipeline_stats(self) -> dict:
+        """Returns queue depth and overrun counters of receive pipeline stages.
+
+        Returns
+        -------
+        dict
+            Statistics of "decoder" and "dispatch" stages, empty if Dvl was
+            created without pipeline.
+        """
+        return self._commands.get_pipeline_stats()
+
     def change_baud_rate(self, baud_index: int) -> bool:
         """Changes baud rate on open port.
         """
         baudrate = 115200 if baud_index == 7 else 9600
         return self._commands.port.set_baudrate(baudrate)
+
+_ALL_INFO_COMMANDS = (CommandIdType.GET_SYSTEM, CommandIdType.GET_COMPONENTS,
+                      CommandIdType.GET_FEATURES, CommandIdType.GET_SETUP,
+                      CommandIdType.GET_TIME)
+
+_CACHED_STRUCTURES = {
+    CommandIdType.GET_COMPONENTS: SystemComponents,
+    CommandIdType.GET_FEATURES: SystemFeatures,
+    CommandIdType.GET_SETUP: SystemSetup,
+}
+
+def _decode(structure, response: AppLayerPacket):
+    """Decodes response into system structure, returns structure unchanged if response is None.
+    """
+    if response is not None:
+        structure.decode(response)
+    return structure
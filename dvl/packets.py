@@ -1,6 +1,8 @@
 """Contains several classes that implement binary packet interface.
 """
 from enum import Enum
+import struct
+import threading
 from dvl.util import print_bytes, print_bytearray, indent_string
 
 class AppLayerIdType(Enum):
@@ -64,6 +66,22 @@ class AppLayerPacket:
             return b""
         return bytes(self.payload)
 
+    def retain(self):
+        """Makes the packet own its payload.
+
+        Packets decoded in zero-copy mode hold a memoryview into the receive
+        buffer which is only valid until the receive callback returns.  Call
+        this function before keeping the packet for later use.
+
+        Returns
+        -------
+        AppLayerPacket
+            This packet.
+        """
+        if isinstance(self.payload, memoryview):
+            self.payload = bytes(self.payload)
+        return self
+
     def get_bytes(self):
         """Returns byte array that corresponds to application layer packet
         """
@@ -77,6 +95,30 @@ class AppLayerPacket:
         arr[4:] = self.payload
         return bytes(arr)
 
+    def encode_into(self, buf, offset: int = 0) -> int:
+        """Writes application layer packet into buffer.
+
+        Parameters
+        ----------
+        buf : writable buffer
+            Buffer (bytearray, memoryview) where packet is written, it has to
+            have at least len bytes after offset.
+        offset : int
+            Position of the packet in the buffer.
+
+        Returns
+        -------
+        int
+            Number of bytes written.
+        """
+        if self.pkt_id is None:
+            return 0
+        _APP_HEADER.pack_into(buf, offset, self.ver, self.pkt_id.value, self.len)
+        start = offset + AppLayerPacket._MIN_PACKET_LEN
+        with memoryview(buf) as view:
+            view[start:offset + self.len] = self.payload
+        return self.len
+
     def create_empty(self):
         """Creates empty packet
         """
@@ -110,9 +152,16 @@ class AppLayerPacket:
         self.len = length + AppLayerPacket._MIN_PACKET_LEN
         self.payload = payload
 
+_APP_HEADER = struct.Struct("<BBH")
+_PHYSICAL_HEADER = struct.Struct("<BBBH")
+
 START_OF_PACKET = 0xAA
 class PhysicalLayerPacket():
     """Physical layer communications interface
+
+    The encoded packet and its checksum are cached until version, packet ID or
+    payload is set again.  An application layer packet that is modified in
+    place has to be assigned to payload again to update the encoding.
     """
     #pylint: disable=too-many-instance-attributes
     PACKET_VER = 0x10
@@ -123,18 +172,21 @@ class PhysicalLayerPacket():
     """Minimum packet length."""
     CHECKSUM_LENGTH = 2
     """Checksum length."""
+    HEADER_LENGTH = 5
+    """Header length (start of packet, version, packet ID and length)."""
 
     def __init__(self,
                  payload: AppLayerPacket = None,
                  packet_id: int = PACKET_ID,
-                 version: int = PACKET_VER):
+                 version: int = PACKET_VER,
+                 checksum: int = None):
         self._version = version
         self._packet_id = packet_id
         self._length = None
         self._payload = payload
-        self._checksum = None
+        self._checksum = checksum
+        self._encoded = None
         self._update_length()
-        self._update_checksum()
 
     def __str__(self):
         return (
@@ -165,27 +217,22 @@ class PhysicalLayerPacket():
     def _update_length(self) -> None:
         self._length = self._calculate_payload_length() + PhysicalLayerPacket.MIN_PACKET_LEN
 
-    def _to_bytearray(self, checksum_included: bool = True) -> bytearray:
-        length = self.length
-        if not checksum_included:
-            length -= PhysicalLayerPacket.CHECKSUM_LENGTH
-        array = bytearray(length)
-        array[0] = START_OF_PACKET
-        array[1] = self._version
-        array[2] = self._packet_id
-        array[3] = self.length & 0x00FF
-        array[4] = (self.length & 0xFF00) >> 8
-        if self._payload:
-            array[5:5+self._calculate_payload_length()] = self._payload.get_bytes()
-        if checksum_included:
-            self._update_checksum()
-            array[-2] = self.checksum & 0x00FF
-            array[-1] = (self.checksum & 0xFF00) >> 8
-        return array
+    def _invalidate(self) -> None:
+        self._encoded = None
+        self._checksum = None
 
-    def _update_checksum(self) -> None:
-        data = self._to_bytearray(checksum_included=False)
-        self._checksum = calc_checksum(data)
+    def _write(self, buf, offset: int) -> None:
+        length = self._length
+        _PHYSICAL_HEADER.pack_into(buf, offset, START_OF_PACKET, self._version,
+                                   self._packet_id, length)
+        if self._payload:
+            self._payload.encode_into(buf, offset + PhysicalLayerPacket.HEADER_LENGTH)
+        end = offset + length - PhysicalLayerPacket.CHECKSUM_LENGTH
+        with memoryview(buf) as view:
+            checksum = calc_checksum(view[offset:end])
+        buf[end] = checksum & 0x00FF
+        buf[end + 1] = (checksum & 0xFF00) >> 8
+        self._checksum = checksum
 
     @property
     def version(self) -> int:
@@ -201,7 +248,7 @@ class PhysicalLayerPacket():
     @version.setter
     def version(self, version: int):
         self._version = version
-        self._update_checksum()
+        self._invalidate()
 
     @property
     def packet_id(self) -> int:
@@ -217,7 +264,7 @@ class PhysicalLayerPacket():
     @packet_id.setter
     def packet_id(self, packet_id: int):
         self._packet_id = packet_id
-        self._update_checksum()
+        self._invalidate()
 
     @property
     def length(self) -> int:
@@ -245,7 +292,7 @@ class PhysicalLayerPacket():
     def payload(self, payload: AppLayerPacket):
         self._payload = payload
         self._update_length()
-        self._update_checksum()
+        self._invalidate()
 
     @property
     def checksum(self) -> int:
@@ -256,9 +303,24 @@ class PhysicalLayerPacket():
         int
             The checksum of the physical layer packet.
         """
-        self._update_checksum()
+        if self._checksum is None:
+            self.encode()
         return self._checksum
 
+    def retain(self):
+        """Makes the packet own its payload, see AppLayerPacket.retain.
+
+        Returns
+        -------
+        PhysicalLayerPacket
+            This packet.
+        """
+        if self._payload is not None:
+            self._payload.retain()
+        if isinstance(self._encoded, memoryview):
+            self._encoded = bytes(self._encoded)
+        return self
+
     def encode(self) -> bytearray:
         """Converts the packet into its bytearray representation.
 
@@ -267,8 +329,36 @@ class PhysicalLayerPacket():
         bytearray
             The bytearray that represents the physical layer packet.
         """
-        data = self._to_bytearray()
-        return bytes(data)
+        if self._encoded is None:
+            data = bytearray(self._length)
+            self._write(data, 0)
+            self._encoded = bytes(data)
+        return bytes(self._encoded)
+
+    def encode_into(self, buf, offset: int = 0) -> int:
+        """Writes encoded packet into preallocated buffer.
+
+        Parameters
+        ----------
+        buf : writable buffer
+            Buffer (bytearray, memoryview) where packet is written.
+        offset : int
+            Position of the packet in the buffer.
+
+        Returns
+        -------
+        int
+            Number of bytes written (packet length).
+        """
+        length = self._length
+        if offset < 0 or len(buf) - offset < length:
+            raise ValueError("Buffer too small for packet of {0} bytes".format(length))
+        if self._encoded is None:
+            self._write(buf, offset)
+        else:
+            with memoryview(buf) as view:
+                view[offset:offset + length] = self._encoded
+        return length
 
 
 def decode(packet: bytearray) -> PhysicalLayerPacket:
@@ -283,15 +373,20 @@ def decode(packet: bytearray) -> PhysicalLayerPacket:
     Returns
     -------
     PhysicalLayerPacket
-        A object that represents the original bytearray.
+        A object that represents the original bytearray.  The checksum is
+        taken from the last two bytes and is not verified.
     """
     if len(packet) <= PhysicalLayerPacket.MIN_PACKET_LEN or packet[0] != START_OF_PACKET:
         return None
-    return PhysicalLayerPacket(
+    pkt = PhysicalLayerPacket(
         version=packet[1],
         packet_id=packet[2],
         payload=AppLayerPacket(packet[5:-2]),
+        checksum=packet[-2] | (packet[-1] << 8),
     )
+    # Received bytes are the encoding of the packet
+    pkt._encoded = packet #pylint: disable=protected-access
+    return pkt
 
 
 def calc_checksum(arr: bytearray) -> int:
@@ -309,140 +404,152 @@ def calc_checksum(arr: bytearray) -> int:
     """
     return sum(arr) & 0xFFFF
 
-class DecoderState(Enum):
-    """Enumerated type class that defines state of the decoder.
-    """
-    START_BYTE = 1
-    """Searching for packet start byte."""
-    VER_BYTE = 2
-    """Searching for packet version number."""
-    PKT_ID = 3
-    """Searching for packet ID."""
-    PKT_LEN = 4
-    """Searching for packet length."""
-    PAYLOAD = 5
-    """Searching for payload."""
-    CHECKSUM = 6
-    """Searching for checksum."""
-
 class PacketDecoder:
     """Finds and decodes physical layer packets.
+
+    Incoming bytes are appended to an internal buffer which is scanned for
+    START_OF_PACKET with bytes.find.  Once a header is found the whole packet
+    is sliced out of the buffer in one step, so the cost per packet does not
+    depend on its length.  Incomplete packets are kept until more bytes arrive.
+
+    The checksum is accumulated while the packet is framed: bytes of an
+    incomplete packet are summed once when they arrive and only the new bytes
+    are added on the next call.  PhysicalLayerPacket is created only for
+    packets that passed the checksum.
+
+    When a header or checksum is invalid the decoder drops the rejected start
+    byte and resumes scanning from the next START_OF_PACKET candidate.  The
+    search never goes backwards, so corrupted streams are decoded in linear
+    time and constant stack depth.
+
+    parse_bytes and clear may be called from different threads, for example
+    clear by a command while the serial thread parses received bytes.
+
+    Parameters
+    ----------
+    zero_copy : bool
+        If True packets are not copied out of the receive buffer: payloads of
+        decoded packets are memoryviews into the buffer.  Such packets are only
+        valid until the function that received them returns, use retain() to
+        keep them longer.
     """
     #pylint: disable=too-many-instance-attributes
     _MAX_PKT_LEN = 33000
 
-    def __init__(self):
-        self._state = DecoderState.START_BYTE
-        self._packet_len = 0
-        self._payload_len = 0
-        self._counter = 0
-        self._arr = bytearray()
-        self._func_dic = { \
-            DecoderState.START_BYTE : self.on_start,
-            DecoderState.VER_BYTE : self.on_ver,
-            DecoderState.PKT_ID : self.on_id,
-            DecoderState.PKT_LEN : self.on_len,
-            DecoderState.PAYLOAD : self.on_payload,
-            DecoderState.CHECKSUM : self.on_checksum}
-
-    def parse_bytes(self, arr):
+    def __init__(self, zero_copy: bool = False):
+        self._zero_copy = zero_copy
+        self._buf = bytearray()
+        self._sum = 0
+        self._sum_len = 0
+        self._lock = threading.Lock()
+        self.bytes_discarded = 0
+        """Number of received bytes that did not belong to any valid packet."""
+        self.resync_count = 0
+        """Number of times a packet candidate was rejected and search restarted."""
+        self.checksum_errors = 0
+        """Number of packet candidates rejected because of invalid checksum."""
+
+    def parse_bytes(self, arr) -> list:
         """Parses bytes array.
-        """
-        packets = []
-        for i in range(len(arr)):
-            pkts = self.parse_byte(arr[i:i+1])
-            if pkts is not None:
-                for pkt in pkts:
-                    packets.append(pkt)
-                    self.clear()
-        return packets
-
-    def clear(self):
-        """Clears decoder state.
-        """
-        self._state = DecoderState.START_BYTE
-        self._packet_len = 0
-        self._payload_len = 0
-        self._counter = 0
-        self._arr = bytearray()
-
-    def on_start(self, byte):
-        """Searches for start of the packet.
-        """
-        if byte[0] == START_OF_PACKET:
-            self.clear()
-            self._arr += byte
-            self._state = DecoderState.VER_BYTE
-
-    def on_ver(self, byte):
-        """Decodes version.
-        """
-        if byte[0] != PhysicalLayerPacket.PACKET_VER:
-            return self.restart()
-        self._state = DecoderState.PKT_ID
-        return None
 
-    def on_id(self, byte):
-        """Decodes packet ID.
-        """
-        if byte[0] != PhysicalLayerPacket.PACKET_ID:
-            return self.restart()
-        self._state = DecoderState.PKT_LEN
-        self._counter = 0
-        return None
+        Parameters
+        ----------
+        arr : bytes
+            Bytes received from the port.
 
-    def on_len(self, byte):
-        """Decodes packet length.
+        Returns
+        -------
+        list
+            List of PhysicalLayerPacket objects found in the stream.
         """
-        self._packet_len |= byte[0] << (8 * self._counter)
-        self._counter += 1
-        if self._counter >= 2:
-            min_len = PhysicalLayerPacket.MIN_PACKET_LEN
-            max_len = PacketDecoder._MAX_PKT_LEN
-            if self._packet_len > max_len or self._packet_len <= min_len:
-                return self.restart()
-            self._state = DecoderState.PAYLOAD
-            self._counter = 0
-            self._payload_len = self._packet_len - PhysicalLayerPacket.MIN_PACKET_LEN
-        return None
+        with self._lock:
+            return self._parse(arr)
 
-    def on_payload(self, byte):
-        """Decodes payload.
+    def _parse(self, arr) -> list:
+        """Parses bytes array, called with the lock held.
         """
-        del byte
-        self._counter += 1
-        if self._counter >= self._payload_len:
-            self._counter = 0
-            self._state = DecoderState.CHECKSUM
-
-    def on_checksum(self, byte):
-        """Decodes and checks checksum.
-        """
-        del byte
-        if self._counter == 0:
-            self._counter += 1
+        #pylint: disable=too-many-locals
+        packets = []
+        buf = self._buf
+        buf += arr
+        buf_len = len(buf)
+        header_len = PhysicalLayerPacket.HEADER_LENGTH
+        min_len = PhysicalLayerPacket.MIN_PACKET_LEN
+        max_len = PacketDecoder._MAX_PKT_LEN
+        running_sum = self._sum
+        summed = self._sum_len
+        pos = 0
+        used = 0
+        with memoryview(buf) as view:
+            while True:
+                start = buf.find(START_OF_PACKET, pos)
+                if start < 0:
+                    pos = buf_len
+                    break
+                if buf_len - start < header_len:
+                    pos = start
+                    break
+                pos = start + 1
+                if buf[pos] != PhysicalLayerPacket.PACKET_VER or \
+                    buf[start + 2] != PhysicalLayerPacket.PACKET_ID:
+                    self.resync_count += 1
+                    continue
+                packet_len = buf[start + 3] | (buf[start + 4] << 8)
+                if packet_len > max_len or packet_len <= min_len:
+                    self.resync_count += 1
+                    continue
+                end = start + packet_len
+                data_end = end - PhysicalLayerPacket.CHECKSUM_LENGTH
+                if start != 0 or summed == 0:
+                    running_sum = sum(view[start:start + header_len])
+                    summed = header_len
+                limit = min(data_end, buf_len)
+                if start + summed < limit:
+                    running_sum += sum(view[start + summed:limit])
+                    summed = limit - start
+                if end > buf_len:
+                    pos = start
+                    break
+                summed = 0
+                checksum = buf[data_end] | (buf[data_end + 1] << 8)
+                if running_sum & 0xFFFF == checksum:
+                    if self._zero_copy:
+                        packets.append(decode(view[start:end]))
+                    else:
+                        packets.append(decode(bytes(view[start:end])))
+                    used += packet_len
+                    pos = end
+                else:
+                    self.checksum_errors += 1
+                    self.resync_count += 1
+        # Partial sum (if any) belongs to the packet that starts the trimmed buffer
+        self._sum = running_sum
+        self._sum_len = summed
+        self.bytes_discarded += pos - used
+        if used and self._zero_copy:
+            # Buffer cannot be resized while decoded packets refer to it
+            self._buf = buf[pos:]
         else:
-            checksum = self._arr[-2] | (self._arr[-1] << 8)
-            pkt = decode(self._arr)
-            if pkt is not None and pkt.checksum == checksum:
-                return [pkt]
-            print("Checksum failed")
-            return self.restart()
-
-        return None
+            del buf[:pos]
+        return packets
 
-    def restart(self):
-        """Restarts search.
+    def parse_byte(self, byte) -> list:
+        """Parses one byte.
         """
-        self._state = DecoderState.START_BYTE
-        if len(self._arr) > 1:
-            arr = self._arr[1:]
-            return self.parse_bytes(arr)
-        return None
+        return self.parse_bytes(byte)
 
-    def parse_byte(self, byte):
-        """Parses one byte.
+    def clear(self):
+        """Clears decoder state.  Bytes of incomplete packet are discarded.
+        """
+        with self._lock:
+            self.bytes_discarded += len(self._buf)
+            self._buf = bytearray()
+            self._sum = 0
+            self._sum_len = 0
+
+    def reset_counters(self):
+        """Resets discarded bytes and resynchronisation counters.
         """
-        assert len(byte) == 1
-        self._arr += byte
-        return self._func_dic[self._state](byte)
+        self.bytes_discarded = 0
+        self.resync_count = 0
+        self.checksum_errors = 0
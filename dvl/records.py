@@ -0,0 +1,232 @@
+"""Contains functions that decode PD output data into numpy record arrays.
+
+These are meant for post-processing of logged data where creating an
+OutputData object for every ping is too slow.
+"""
+import numpy as np
+from dvl.packets import PacketDecoder, PhysicalLayerPacket, AppLayerIdType, START_OF_PACKET
+from dvl.system import OutputData
+
+OUTPUT_DATA_DTYPE = np.dtype([
+    ("struct_id", "u1"),
+    ("version", "u1"),
+    ("size", "<u4"),
+    ("system_type", "u1"),
+    ("system_subtype", "u1"),
+    ("fw_major_version", "u1"),
+    ("fw_minor_version", "u1"),
+    ("fw_patch_version", "u1"),
+    ("fw_build_version", "u1"),
+    ("year", "u1"),
+    ("month", "u1"),
+    ("day", "u1"),
+    ("hour", "u1"),
+    ("minute", "u1"),
+    ("second", "u1"),
+    ("millisecond", "<u2"),
+    ("coordinate_system", "u1"),
+    ("vel_x", "<f4"),
+    ("vel_y", "<f4"),
+    ("vel_z", "<f4"),
+    ("vel_err", "<f4"),
+    ("range_beam1", "<f4"),
+    ("range_beam2", "<f4"),
+    ("range_beam3", "<f4"),
+    ("range_beam4", "<f4"),
+    ("mean_range", "<f4"),
+    ("speed_of_sound", "<f4"),
+    ("status", "<u2"),
+    ("bit_count", "u1"),
+    ("bit_code", "u1"),
+    ("voltage", "<f4"),
+    ("transmit_voltage", "<f4"),
+    ("current", "<f4"),
+    ("serial_number", "S6"),
+])
+"""Structured dtype that mirrors the layout of PD 0x11 output data (without
+reserved bytes and checksum).  Field names match OutputData attributes, the
+year is stored as in the structure (years since 2000)."""
+
+RECORD_DTYPE = np.dtype(OUTPUT_DATA_DTYPE.descr + [("is_valid", "?")])
+"""Dtype of arrays returned by decode_output_data: OUTPUT_DATA_DTYPE fields
+followed by is_valid flag (size and checksum are correct)."""
+
+def _layout(size: int) -> np.dtype:
+    """Returns OUTPUT_DATA_DTYPE padded to structure size.
+    """
+    return np.dtype({
+        "names": OUTPUT_DATA_DTYPE.names,
+        "formats": [OUTPUT_DATA_DTYPE.fields[name][0] for name in OUTPUT_DATA_DTYPE.names],
+        "offsets": [OUTPUT_DATA_DTYPE.fields[name][1] for name in OUTPUT_DATA_DTYPE.names],
+        "itemsize": size,
+    })
+
+def decode_output_data(payloads, size: int = None) -> np.ndarray:
+    """Decodes sequence of PD output data structures into record array.
+
+    Parameters
+    ----------
+    payloads : sequence of bytes
+        Output data structures (application layer payloads of DATA_PD packets).
+    size : int
+        Structure size.  If None the size of the first structure is used.
+        Structures of different size are skipped.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of RECORD_DTYPE, one record per structure.
+    """
+    if size is None:
+        size = len(payloads[0]) if len(payloads) > 0 else OutputData._MIN_SIZE #pylint: disable=protected-access
+    data = b"".join(payload for payload in payloads if len(payload) == size)
+    count = len(data) // size
+    return _decode(np.frombuffer(data, dtype=np.uint8).reshape(count, size))
+
+def _decode(raw: np.ndarray) -> np.ndarray:
+    """Decodes output data structures, one per row of C-contiguous uint8 array.
+    """
+    (count, size) = raw.shape
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    if count == 0 or size < OUTPUT_DATA_DTYPE.itemsize:
+        return records
+
+    fields = np.frombuffer(raw, dtype=_layout(size))
+    for name in OUTPUT_DATA_DTYPE.names:
+        records[name] = fields[name]
+    records["serial_number"][records["version"] == 0x10] = b"0"
+
+    checksum = raw[:, -2].astype(np.uint32) | (raw[:, -1].astype(np.uint32) << 8)
+    calculated = raw[:, :-2].sum(axis=1, dtype=np.uint32) & 0xFFFF
+    records["is_valid"] = (records["size"] == size) & (calculated == checksum)
+    if size < OutputData._MIN_SIZE: #pylint: disable=protected-access
+        records["is_valid"] = False
+    return records
+
+def read_pd_log(file_name: str) -> np.ndarray:
+    """Decodes PD output data from a log file created by data logging.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the log (.pd) file.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of RECORD_DTYPE, one record per ping.
+    """
+    arr = np.fromfile(file_name, dtype=np.uint8)
+    (starts, lengths) = _find_packets(arr)
+    offset = PhysicalLayerPacket.HEADER_LENGTH
+    is_pd = arr[starts + offset + 1] == AppLayerIdType.DATA_PD.value
+    starts = starts[is_pd]
+    # Output data structure is application layer payload
+    sizes = lengths[is_pd] - offset - _APP_HEADER_LENGTH - PhysicalLayerPacket.CHECKSUM_LENGTH
+    size = int(sizes[0]) if len(sizes) > 0 else OutputData._MIN_SIZE #pylint: disable=protected-access
+    starts = starts[sizes == size] + offset + _APP_HEADER_LENGTH
+    return _decode(arr[starts[:, np.newaxis] + np.arange(size)])
+
+_APP_HEADER_LENGTH = 4
+
+def _find_packets(arr: np.ndarray) -> (np.ndarray, np.ndarray):
+    """Locates physical layer packets with valid header and checksum.
+
+    Candidates that start inside an earlier packet are ignored, like
+    PacketDecoder does.
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray)
+        Start offsets and lengths of packets.
+    """
+    header_len = PhysicalLayerPacket.HEADER_LENGTH
+    count = len(arr) - header_len + 1
+    if count <= 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    starts = np.flatnonzero((arr[:count] == START_OF_PACKET) &
+                            (arr[1:count + 1] == PhysicalLayerPacket.PACKET_VER) &
+                            (arr[2:count + 2] == PhysicalLayerPacket.PACKET_ID))
+    lengths = arr[starts + 3].astype(np.int64) | (arr[starts + 4].astype(np.int64) << 8)
+    valid = (lengths > PhysicalLayerPacket.MIN_PACKET_LEN) & \
+        (lengths <= PacketDecoder._MAX_PKT_LEN) & \
+        (starts + lengths <= len(arr)) #pylint: disable=protected-access
+    starts = starts[valid]
+    lengths = lengths[valid]
+
+    # Checksums from running sum, 16-bit overflow cancels out in the difference
+    running_sum = np.zeros(len(arr) + 1, dtype=np.uint16)
+    np.cumsum(arr, dtype=np.uint16, out=running_sum[1:])
+    data_end = starts + lengths - PhysicalLayerPacket.CHECKSUM_LENGTH
+    checksum = arr[data_end].astype(np.uint16) | (arr[data_end + 1].astype(np.uint16) << 8)
+    valid = running_sum[data_end] - running_sum[starts] == checksum
+    starts = starts[valid]
+    lengths = lengths[valid]
+
+    if len(starts) > 1:
+        ends = np.maximum.accumulate(starts + lengths)
+        valid = np.ones(len(starts), dtype=bool)
+        valid[1:] = starts[1:] >= ends[:-1]
+        starts = starts[valid]
+        lengths = lengths[valid]
+    return (starts, lengths)
+
+def velocity_valid(records: np.ndarray, component: int = None) -> np.ndarray:
+    """Returns mask of valid velocities, see OutputData.is_velocity_valid.
+
+    Parameters
+    ----------
+    records : numpy.ndarray
+        Records returned by decode_output_data.
+    component : int
+        Component number (1-4).  If None velocity validity corresponds to magnitude.
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean array, True where value is valid.
+    """
+    names = {1: "vel_x", 2: "vel_y", 3: "vel_z", 4: "vel_err"}
+    if component is None:
+        valid = ~(np.isnan(records["vel_x"]) | np.isnan(records["vel_y"]))
+    elif component in names:
+        valid = ~np.isnan(records[names[component]])
+    else:
+        valid = np.zeros(len(records), dtype=bool)
+    return valid & records["is_valid"]
+
+def range_valid(records: np.ndarray, beam: int = None) -> np.ndarray:
+    """Returns mask of valid ranges to bottom, see OutputData.is_range_valid.
+
+    Parameters
+    ----------
+    records : numpy.ndarray
+        Records returned by decode_output_data.
+    beam : int
+        Beam number (1-4).  If None range corresponds to mean range.
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean array, True where value is valid.
+    """
+    if beam is None:
+        name = "mean_range"
+    elif beam in (1, 2, 3, 4):
+        name = "range_beam{0}".format(beam)
+    else:
+        return np.zeros(len(records), dtype=bool)
+    return ~np.isnan(records[name]) & records["is_valid"]
+
+def date_times(records: np.ndarray) -> np.ndarray:
+    """Returns ping time stamps as numpy.datetime64 array, see OutputData.get_date_time.
+    """
+    year = records["year"].astype(np.int64)
+    year[year < 100] += 2000
+    dates = (year - 1970).astype("datetime64[Y]") + \
+        (records["month"].astype(np.int64) - 1).astype("timedelta64[M]")
+    dates = dates.astype("datetime64[D]") + \
+        (records["day"].astype(np.int64) - 1).astype("timedelta64[D]")
+    msec = ((records["hour"].astype(np.int64) * 60 + records["minute"]) * 60 + \
+        records["second"]) * 1000 + records["millisecond"]
+    return dates.astype("datetime64[ms]") + msec.astype("timedelta64[ms]")
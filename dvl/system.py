@@ -8,7 +8,7 @@ import struct
 import datetime
 from enum import Enum, auto
 import numpy as np
-from dvl.packets import AppLayerPacket, AppLayerIdType, calc_checksum
+from dvl.packets import AppLayerPacket, AppLayerIdType
 from dvl.util import Setting, indent_string
 
 class DateTime():
@@ -26,19 +26,15 @@ class DateTime():
         arr = packet.get_payload()
         if len(arr) < DateTime._SIZE:
             return None
-        arr = arr[DateTime._OFFSET:]
+        offset = DateTime._OFFSET
         try:
-            [size] = struct.unpack("I", arr[2:6])
+            [size] = struct.unpack_from("I", arr, offset + 2)
             if size != DateTime._SIZE:
                 return None
-            year = arr[6]
+            (year, month, day, hour, minutes, second) = \
+                struct.unpack_from("6B", arr, offset + 6)
             if year < 99:
                 year += 2000
-            month = arr[7]
-            day = arr[8]
-            hour = arr[9]
-            minutes = arr[10]
-            second = arr[11]
             if day <= 0 or day > 31 or month <= 0 or month > 12:
                 date_time = None
             else:
@@ -84,6 +80,10 @@ class SystemInfo:
     """Class that contains system information.
     """
     #pylint: disable=too-many-instance-attributes
+    __slots__ = ("is_valid", "struct_id", "version", "size", "frequency",
+                 "fw_major_version", "fw_minor_version", "fw_patch_version",
+                 "fw_build_version", "fpga_version", "system_id", "xducer_type",
+                 "beam_angle", "has_vertical_beam", "system_type", "system_subtype")
 
     _STRUCTURE_ID = 0x21
     _VERSION = 0x10
@@ -188,27 +188,25 @@ class SystemInfo:
         length = len(arr)
         if length < SystemInfo._SIZE + SystemInfo._OFFSET - 2:
             return
-        arr = arr[SystemInfo._OFFSET:]
+        offset = SystemInfo._OFFSET
         try:
-            self.struct_id = arr[0]
-            self.version = arr[1]
-            [self.size] = struct.unpack("I", arr[2:6])
-            [self.frequency] = struct.unpack("f", arr[6:10])
-            self.fw_major_version = arr[10]
-            self.fw_minor_version = arr[11]
-            self.fw_patch_version = arr[12]
-            self.fw_build_version = arr[13]
-            [self.fpga_version] = struct.unpack("I", arr[14:18])
-            [self.system_id] = struct.unpack("Q", arr[18:26])
-            self.xducer_type = arr[26]
-            [self.beam_angle] = struct.unpack("f", arr[27:31])
+            self.struct_id = arr[offset]
+            self.version = arr[offset + 1]
+            [self.size] = struct.unpack_from("I", arr, offset + 2)
+            [self.frequency] = struct.unpack_from("f", arr, offset + 6)
+            (self.fw_major_version, self.fw_minor_version, self.fw_patch_version,
+             self.fw_build_version) = struct.unpack_from("4B", arr, offset + 10)
+            [self.fpga_version] = struct.unpack_from("I", arr, offset + 14)
+            [self.system_id] = struct.unpack_from("Q", arr, offset + 18)
+            self.xducer_type = arr[offset + 26]
+            [self.beam_angle] = struct.unpack_from("f", arr, offset + 27)
             self.has_vertical_beam = False
-            if arr[31] > 0:
+            if arr[offset + 31] > 0:
                 self.has_vertical_beam = True
 
             if self.size == SystemInfo._SIZE:
-                self.system_type = arr[133]
-                self.system_subtype = arr[134]
+                self.system_type = arr[offset + 133]
+                self.system_subtype = arr[offset + 134]
             self.is_valid = True
 
         except ValueError:
@@ -250,6 +248,8 @@ class SystemComponents:
     """Class that contains system hardware components information.
     """
     #pylint: disable=too-many-instance-attributes
+    __slots__ = ("is_valid", "struct_id", "version", "size", "num_hardware",
+                 "hardware_pn", "hardware_rev", "hardware_sn")
 
     _STRUCTURE_ID = 0x29
     _VERSION = 0x10
@@ -331,20 +331,20 @@ class SystemComponents:
         length = len(arr)
         if length < SystemComponents._SIZE + SystemComponents._OFFSET - 2:
             return
-        arr = arr[SystemComponents._OFFSET:]
+        offset = SystemComponents._OFFSET
         try:
-            self.struct_id = arr[0]
-            self.version = arr[1]
-            [self.size] = struct.unpack("I", arr[2:6])
-            self.num_hardware = arr[6]
-            offset = 7
+            self.struct_id = arr[offset]
+            self.version = arr[offset + 1]
+            [self.size] = struct.unpack_from("I", arr, offset + 2)
+            self.num_hardware = arr[offset + 6]
+            offset += 7
             self.hardware_pn = []
             self.hardware_rev = []
             self.hardware_sn = []
             if self.num_hardware == SystemComponents._NUM_HARDWARE:
                 for _ in range(SystemComponents._NUM_HARDWARE):
                     limit = offset+32
-                    data = arr[offset:limit]
+                    data = bytes(arr[offset:limit])
                     data_bin = data.strip(b'\x00').split(b"\x00")
                     if len(data_bin) >= 3:
                         self.hardware_pn.append(data_bin[0].decode("utf-8", errors='ignore'))
@@ -490,13 +490,13 @@ class SystemFeatures:
         length = len(arr)
         if length < SystemFeatures._SIZE + SystemFeatures._OFFSET:
             return
-        arr = arr[SystemFeatures._OFFSET:]
+        offset = SystemFeatures._OFFSET
         try:
-            self.struct_id = arr[0]
-            self.version = arr[1]
-            [self.size] = struct.unpack("I", arr[2:6])
+            self.struct_id = arr[offset]
+            self.version = arr[offset + 1]
+            [self.size] = struct.unpack_from("I", arr, offset + 2)
             self.features = []
-            base = arr[6]
+            base = arr[offset + 6]
             self.features.append(base)
             if base == 0:
                 self.features.append(1)
@@ -556,6 +556,8 @@ class SystemSetup:
     """Class that contains user system setup.
     """
     #pylint: disable=too-many-instance-attributes
+    __slots__ = ("is_valid", "struct_id", "version", "size", "software_trigger",
+                 "baud_rate_type", "speed_of_sound", "max_depth", "max_vb_range")
 
     _STRUCTURE_ID = 0x22
     _VERSION = 0x11
@@ -631,17 +633,16 @@ class SystemSetup:
         length = len(arr)
         if length < SystemSetup._SIZE + SystemSetup._OFFSET:
             return
-        arr = arr[SystemSetup._OFFSET:]
+        offset = SystemSetup._OFFSET
         try:
-            self.struct_id = arr[0]
-            self.version = arr[1]
-            [self.size] = struct.unpack("I", arr[2:6])
-            self.software_trigger = arr[6]
-            self.baud_rate_type = arr[7]
-            [self.speed_of_sound] = struct.unpack("f", arr[8:12])
-            [self.max_depth] = struct.unpack("f", arr[12:16])
+            self.struct_id = arr[offset]
+            self.version = arr[offset + 1]
+            [self.size] = struct.unpack_from("I", arr, offset + 2)
+            self.software_trigger = arr[offset + 6]
+            self.baud_rate_type = arr[offset + 7]
+            [self.speed_of_sound, self.max_depth] = struct.unpack_from("ff", arr, offset + 8)
             if self.version > 0x10:
-                [self.max_vb_range] = struct.unpack("f", arr[16:20])
+                [self.max_vb_range] = struct.unpack_from("f", arr, offset + 16)
             self.is_valid = True
 
         except ValueError:
@@ -709,6 +710,7 @@ class SystemSetup:
 class SystemTests:
     """Class that contains system tests results.
     """
+    __slots__ = ("is_valid", "struct_id", "version", "size", "tests")
     _STRUCTURE_ID = 0x24
     _VERSION = 0x10
     _SIZE = 12
@@ -750,14 +752,13 @@ class SystemTests:
         offset = 6
         if length == SystemTests._STATUS_SIZE:
             offset = 4
-        arr = arr[offset:]
         try:
-            self.struct_id = arr[0]
-            self.version = arr[1]
-            [self.size] = struct.unpack("I", arr[2:6])
+            self.struct_id = arr[offset]
+            self.version = arr[offset + 1]
+            [self.size] = struct.unpack_from("I", arr, offset + 2)
             self.tests = []
             for i in range(SystemTests._NUM_TESTS):
-                self.tests.append(arr[6+i])
+                self.tests.append(arr[offset + 6 + i])
             self.is_valid = True
 
         except ValueError:
@@ -869,16 +870,13 @@ class SystemUpdateStatus:
         length = len(arr)
         if length < SystemUpdateStatus._SIZE + SystemUpdateStatus._OFFSET:
             return
-        arr = arr[SystemUpdateStatus._OFFSET:]
+        offset = SystemUpdateStatus._OFFSET
         try:
-            self.struct_id = arr[0]
-            self.version = arr[1]
-            [self.size] = struct.unpack("I", arr[2:6])
-            self.monolith = arr[6]
-            self.fpga_image = arr[7]
-            self.fpga_update = arr[8]
-            self.apps_image = arr[9]
-            self.apps_update = arr[10]
+            self.struct_id = arr[offset]
+            self.version = arr[offset + 1]
+            [self.size] = struct.unpack_from("I", arr, offset + 2)
+            (self.monolith, self.fpga_image, self.fpga_update, self.apps_image,
+             self.apps_update) = struct.unpack_from("5B", arr, offset + 6)
             self.is_valid = True
 
         except ValueError:
@@ -892,10 +890,68 @@ class SystemUpdateStatus:
 
 class OutputData:
     """Class that contains output ping data.
-     """
+
+    Attributes
+    ----------
+    is_valid : bool
+        Defines if data in the class are valid.
+    count : int
+        Count used externally to count number of data packets.
+    struct_id : int
+        Structure ID number.
+    version : int
+        Structure version number.
+    size : int
+        Structure size.
+    system_type : int
+        System type (76 for Wayfinder).
+    system_subtype : int
+        System sub-type (0 for Wayfinder).
+    fw_major_version, fw_minor_version, fw_patch_version, fw_build_version : int
+        Firmware major, minor, patch and build numbers.
+    year, month, day, hour, minute, second, millisecond : int
+        Ping time stamp.
+    coordinate_system : int
+        Coordinate system (0 - 3).
+    vel_x, vel_y, vel_z, vel_err : float
+        Beam 1-4 or X, Y, Z and error velocity in m/s.
+    range_beam1, range_beam2, range_beam3, range_beam4 : float
+        Beam 1-4 range to bottom in meters.
+    mean_range : float
+        Mean range to bottom in meters.
+    speed_of_sound : float
+        Speed of sound used in m/s.
+    status : int
+        Status word.
+    bit_count : int
+        Number built in test errors.
+    bit_code : int
+        Built in test error code.  For more information please refer to Wayfinder DVL guide.
+    voltage : float
+        Input voltage in Volts.
+    transmit_voltage : float
+        Transmit voltage in Volts.
+    current : float
+        Current in Amps.
+    serial_number : str
+        Serial number of the system.
+    reserved : bytes
+        Reserved bytes.
+    """
+    __slots__ = ("is_valid", "count", "struct_id", "version", "size", "system_type",
+                 "system_subtype", "fw_major_version", "fw_minor_version",
+                 "fw_patch_version", "fw_build_version", "year", "month", "day", "hour",
+                 "minute", "second", "millisecond", "coordinate_system",
+                 "vel_x", "vel_y", "vel_z", "vel_err",
+                 "range_beam1", "range_beam2", "range_beam3", "range_beam4",
+                 "mean_range", "speed_of_sound", "status", "bit_count", "bit_code",
+                 "voltage", "transmit_voltage", "current", "serial_number", "reserved",
+                 "_checksum")
 
     _MIN_SIZE = 87
     _VERSION = 0x11
+    _STRUCT_x10 = struct.Struct("<BBIBB4B6BHB4f4fffHBBfff")
+    _STRUCT_x11 = struct.Struct("<BBIBB4B6BHB4f4fffHBBfff6s")
     COORDINATES = ["Beam", "XYZ", "Ship", "Earth"]
     """List of coordinate systems ("Beam", "XYZ", "Ship", "Earth")."""
 
@@ -903,110 +959,43 @@ class OutputData:
         if arr is None:
             self._create_empty()
             return
-
-        length = len(arr)
-        [self.size] = struct.unpack("I", arr[2:6])
-        self.is_valid = (length == self.size)
-        """Defines if data in the class are valid."""
-        if length < OutputData._MIN_SIZE:
-            self.is_valid = False
-        self._checksum = self._checksum = arr[-2] | (arr[-1] << 8)
-        checksum = calc_checksum(arr[0:-2])
-        if self._checksum != checksum:
-            self.is_valid = False
-        if not self.is_valid:
+        if not self._validate(arr):
             return
 
         self.count = 0
-        """Count used externally to count number of data packets."""
-        self.struct_id = arr[0]
-        """Structure ID number."""
-        self.version = arr[1]
-        """Structure version number."""
-        self.system_type = arr[6]
-        """System type (76 for Wayfinder)."""
-        self.system_subtype = arr[7]
-        """System sub-type (0 for Wayfinder)."""
-        self.fw_major_version = arr[8]
-        """Firmware major number."""
-        self.fw_minor_version = arr[9]
-        """Firmware minor number."""
-        self.fw_patch_version = arr[10]
-        """Firmware patch number."""
-        self.fw_build_version = arr[11]
-        """Firmware build number."""
-        self.year = arr[12]
-        """Part of ping time stamp - year."""
+        if arr[1] == 0x10:
+            layout = OutputData._STRUCT_x10
+        else:
+            layout = OutputData._STRUCT_x11
+        (self.struct_id, self.version, self.size, self.system_type, self.system_subtype,
+         self.fw_major_version, self.fw_minor_version, self.fw_patch_version,
+         self.fw_build_version, self.year, self.month, self.day, self.hour, self.minute,
+         self.second, self.millisecond, self.coordinate_system,
+         self.vel_x, self.vel_y, self.vel_z, self.vel_err,
+         self.range_beam1, self.range_beam2, self.range_beam3, self.range_beam4,
+         self.mean_range, self.speed_of_sound, self.status, self.bit_count, self.bit_code,
+         self.voltage, self.transmit_voltage, self.current, *serial) = layout.unpack_from(arr)
         if self.year < 100:
             self.year += 2000
-        self.month = arr[13]
-        """Part of ping time stamp - month."""
-        self.day = arr[14]
-        """Part of ping time stamp - day."""
-        self.hour = arr[15]
-        """Part of ping time stamp - hour."""
-        self.minute = arr[16]
-        """Part of ping time stamp - minute."""
-        self.second = arr[17]
-        """Part of ping time stamp - second."""
-        [self.millisecond] = struct.unpack("H", arr[18:20])
-        """Part of ping time stamp - millisecond."""
-        self.coordinate_system = arr[20]
-        """Coordinate system (0 - 3)."""
-        self.vel_x = 0
-        """Beam 1 or X velocity in m/s."""
-        self.vel_y = 0
-        """Beam 2 or Y velocity in m/s."""
-        self.vel_z = 0
-        """Beam 3 or Z velocity in m/s."""
-        self.vel_err = 0
-        """Beam 4 or error velocity in m/s."""
-        [self.vel_x, self.vel_y, self.vel_z, self.vel_err] = struct.unpack("ffff", arr[21:37])
-        self.range_beam1 = 0
-        """ Beam 1 range to bottom in meters."""
-        self.range_beam2 = 0
-        """ Beam 2 range to bottom in meters."""
-        self.range_beam3 = 0
-        """ Beam 3 range to bottom in meters."""
-        self.range_beam4 = 0
-        """ Beam 4 range to bottom in meters."""
-        [self.range_beam1, self.range_beam2, self.range_beam3, self.range_beam4] \
-            = struct.unpack("ffff", arr[37:53])
-        self.mean_range = 0
-        """ Mean range to bottom in meters."""
-        [self.mean_range] = struct.unpack("f", arr[53:57])
-        self.speed_of_sound = 0
-        """Speed of sound used in m/s."""
-        [self.speed_of_sound] = struct.unpack("f", arr[57:61])
-        self.status = 0
-        """Status word."""
-        [self.status] = struct.unpack("H", arr[61:63])
-        self.bit_count = arr[63]
-        """Number built in test errors."""
-        self.bit_code = arr[64]
-        """Built in test error code.  For more information please refer to Wayfinder DVL guide."""
-        self.voltage = 0
-        """Input voltage in Volts."""
-        [self.voltage] = struct.unpack("f", arr[65:69])
-        self.transmit_voltage = 0
-        """Transmit voltage in Volts."""
-        [self.transmit_voltage] = struct.unpack("f", arr[69:73])
-        self.current = 0
-        """Current in Amps."""
-        [self.current] = struct.unpack("f", arr[73:77])
         self.serial_number = "0"
-        """Serial number of the system."""
-        if self.version == 0x10:
-            start = 77
-        else:
-            start = 83
-            try:
-                value = arr[77:83].decode("utf-8", errors='ignore')
-            except UnicodeDecodeError:
-                value = "0"
-            self.serial_number = value
+        if serial:
+            self.serial_number = serial[0].decode("utf-8", errors='ignore')
+        self.reserved = bytes(arr[layout.size:-2])
 
-        self.reserved = arr[start:-2]
+    def _validate(self, arr) -> bool:
+        """Checks size and checksum of the structure, sets size and is_valid.
+        """
+        length = len(arr)
+        [self.size] = struct.unpack_from("I", arr, 2)
+        self.is_valid = (length == self.size)
+        if length < OutputData._MIN_SIZE:
+            self.is_valid = False
+        self._checksum = arr[-2] | (arr[-1] << 8)
+        # Sum of all bytes except checksum, computed without slicing the array
+        checksum = (sum(arr) - arr[-2] - arr[-1]) & 0xFFFF
+        if self._checksum != checksum:
+            self.is_valid = False
+        return self.is_valid
 
     def is_range_valid(self, beam=None):
         """Returns if range to bottom is valid
@@ -1033,7 +1022,7 @@ class OutputData:
                 elif beam == 3:
                     valid = not math.isnan(self.range_beam3)
                 elif beam == 4:
-                    valid = math.isnan(self.range_beam4)
+                    valid = not math.isnan(self.range_beam4)
         return valid
 
     def is_velocity_valid(self, component=None):
@@ -1180,6 +1169,87 @@ class OutputData:
 
         return settings
 
+class LazyOutputData(OutputData):
+    """Output ping data decoded on first access.
+
+    Size and checksum are validated when the object is created, the same way
+    as in OutputData.  Fields are decoded in groups (header, time stamp,
+    velocities, ranges, status and serial number) when one of the fields in a
+    group is read for the first time.  The object keeps a copy of the
+    structure, so it remains valid in zero-copy mode.
+    """
+    __slots__ = ("_arr",)
+
+    _HEADER = struct.Struct("<BB4xBB4B")
+    _TIME = struct.Struct("<6BH")
+    _VELOCITY = struct.Struct("<B4f")
+    _RANGE = struct.Struct("<6f")
+    _STATUS = struct.Struct("<HBBfff")
+
+    def __init__(self, arr: bytearray):
+        #pylint: disable=super-init-not-called
+        if arr is None:
+            self._create_empty()
+            return
+        if self._validate(arr):
+            self.count = 0
+            self._arr = bytes(arr)
+
+    def __getattr__(self, name):
+        # Called only for fields that are not decoded yet
+        decode = LazyOutputData._FIELDS.get(name)
+        if decode is None or not self.is_valid:
+            raise AttributeError("'{0}' object has no attribute '{1}'".format(
+                type(self).__name__, name))
+        decode(self)
+        return getattr(self, name)
+
+    def _decode_header(self):
+        (self.struct_id, self.version, self.system_type, self.system_subtype,
+         self.fw_major_version, self.fw_minor_version, self.fw_patch_version,
+         self.fw_build_version) = LazyOutputData._HEADER.unpack_from(self._arr, 0)
+
+    def _decode_time(self):
+        (self.year, self.month, self.day, self.hour, self.minute, self.second,
+         self.millisecond) = LazyOutputData._TIME.unpack_from(self._arr, 12)
+        if self.year < 100:
+            self.year += 2000
+
+    def _decode_velocity(self):
+        (self.coordinate_system, self.vel_x, self.vel_y, self.vel_z,
+         self.vel_err) = LazyOutputData._VELOCITY.unpack_from(self._arr, 20)
+
+    def _decode_range(self):
+        (self.range_beam1, self.range_beam2, self.range_beam3, self.range_beam4,
+         self.mean_range, self.speed_of_sound) = LazyOutputData._RANGE.unpack_from(self._arr, 37)
+
+    def _decode_status(self):
+        (self.status, self.bit_count, self.bit_code, self.voltage, self.transmit_voltage,
+         self.current) = LazyOutputData._STATUS.unpack_from(self._arr, 61)
+
+    def _decode_serial_number(self):
+        start = OutputData._STRUCT_x10.size
+        self.serial_number = "0"
+        if self._arr[1] != 0x10:
+            end = OutputData._STRUCT_x11.size
+            self.serial_number = self._arr[start:end].decode("utf-8", errors='ignore')
+            start = end
+        self.reserved = self._arr[start:-2]
+
+    _GROUPS = {
+        _decode_header: ("struct_id", "version", "system_type", "system_subtype",
+                         "fw_major_version", "fw_minor_version", "fw_patch_version",
+                         "fw_build_version"),
+        _decode_time: ("year", "month", "day", "hour", "minute", "second", "millisecond"),
+        _decode_velocity: ("coordinate_system", "vel_x", "vel_y", "vel_z", "vel_err"),
+        _decode_range: ("range_beam1", "range_beam2", "range_beam3", "range_beam4",
+                        "mean_range", "speed_of_sound"),
+        _decode_status: ("status", "bit_count", "bit_code", "voltage", "transmit_voltage",
+                         "current"),
+        _decode_serial_number: ("serial_number", "reserved"),
+    }
+    _FIELDS = {name: decode for (decode, names) in _GROUPS.items() for name in names}
+
 class FftTest:
     """Class that contains FFT (interference) test
     """
@@ -1257,6 +1327,9 @@ class FftData:
         self.count = 0
         self.data = []
         self.xdata = []
+        self._signal = None
+        self.averager = SpectrumAverager()
+        """Averager used by average, set before the first call to change averaging mode."""
         if arr is not None:
             self.decode_from_array(arr)
 
@@ -1268,33 +1341,24 @@ class FftData:
             self.__init__(None)
             return
         try:
-            [self.tag] = struct.unpack("I", arr[0:4])
-            [size] = struct.unpack("I", arr[4:8])
+            [self.tag, size] = struct.unpack_from("II", arr, 0)
             if size != FftData._SIZE:
                 return
-            [self.samples_to_collect] = struct.unpack("I", arr[8:12])
-            [self.fft_len] = struct.unpack("I", arr[12:16])
-            [self.sample_offset] = struct.unpack("I", arr[16:20])
-            [self.gain] = struct.unpack("I", arr[20:24])
-            [self.beam_mask] = struct.unpack("I", arr[24:28])
-            [self.bandwidth] = struct.unpack("I", arr[28:32])
-            [self.system_freq] = struct.unpack("I", arr[32:36])
-            [self.sample_freq] = struct.unpack("I", arr[36:40])
-            samples = self.fft_len
+            (self.samples_to_collect, self.fft_len, self.sample_offset, self.gain,
+             self.beam_mask, self.bandwidth, self.system_freq, self.sample_freq) = \
+                struct.unpack_from("8I", arr, 8)
             beams = FftData.NUM_BEAMS
+            # Samples are interleaved by beam: (real, imag) int32 pair for each beam
+            samples = np.frombuffer(arr, dtype="<i4", count=self.fft_len * beams * 2,
+                                    offset=40).reshape(self.fft_len, beams, 2)
+            signal = np.empty((beams, self.fft_len), dtype=np.complex128)
+            signal.real = samples[:, :, 0].T
+            signal.imag = samples[:, :, 1].T
+            self._signal = signal
             self.data = []
             for i in range(beams):
-                beam_data = FftBeamData(i, samples)
+                beam_data = FftBeamData(i, self.fft_len, signal[i])
                 self.data.append(beam_data)
-
-            offset = 40
-            fft_len = samples
-            for i in range(fft_len):
-                for beam_data in self.data:
-                    end = offset+8
-                    [real, imag] = struct.unpack("ii", arr[offset:end])
-                    offset = end
-                    beam_data.signal[i] = complex(real, imag)
             self.is_valid = True
             self.count = 1
         except ValueError:
@@ -1310,43 +1374,62 @@ class FftData:
         """
         if self.is_valid:
             base_freq = self.system_freq * 0.001
-            freq_khz = base_freq
-            if self.bandwidth == 1:
-                freq_khz /= 4.0
-            freqband = freq_khz/self.fft_len
-            self.xdata = np.zeros(self.fft_len, dtype=np.float)
-            for i in range(self.fft_len):
-                self.xdata[i] = freqband * i - freq_khz / 2
-            for beam_data in self.data:
-                beam_data.do_fft()
+            self.xdata = _frequency_axis(self.system_freq, self.bandwidth, self.fft_len)
+            spectrum = _power_spectrum(np.fft.fft(self._signal, axis=1))
+            power_ratio = np.zeros_like(spectrum)
+            for i, beam_data in enumerate(self.data):
+                beam_data.spectrum = spectrum[i]
+                beam_data.power_ratio = power_ratio[i]
+                beam_data._calc_power() #pylint: disable=protected-access
+                beam_data.processed = True
                 beam_data.frequency_peak = self.xdata[beam_data.peak_index] + base_freq
 
     def average(self, fft):
-        """Averages FFT
+        """Averages FFT using averager.  Spectra of processed FFT are added to
+        the average and peaks are recalculated.
         """
+        if not fft.data or not all(beam_data.processed for beam_data in fft.data):
+            return
         if self.count == 0:
             self.xdata = fft.xdata
-            self.data = fft.data
+            self.data = [FftBeamData(beam_data.beam, beam_data.fft_len, beam_data.signal)
+                         for beam_data in fft.data]
+            self.fft_len = fft.fft_len
             self.system_freq = fft.system_freq
             self.bandwidth = fft.bandwidth
             self.is_valid = True
+            self.averager.reset()
 
+        spectrum = self.averager.update([beam_data.spectrum for beam_data in fft.data]).copy()
+        power_ratio = np.zeros_like(spectrum)
         base_freq = self.system_freq * 0.001
         for i, beam_data in enumerate(self.data):
-            beam_data.average(fft.data[i], self.count)
+            beam_data.spectrum = spectrum[i]
+            beam_data.power_ratio = power_ratio[i]
+            beam_data._calc_power() #pylint: disable=protected-access
+            beam_data.processed = True
             beam_data.frequency_peak = self.xdata[beam_data.peak_index] + base_freq
         self.count += 1
 
+    @property
+    def variance(self) -> np.ndarray:
+        """Per-bin variance of averaged spectra, one row per beam."""
+        return self.averager.variance
+
 class FftBeamData:
     """Class that stores FFT beam data
     """
     #pylint: disable=too-many-instance-attributes
-    def __init__(self, beam_no: int, fft_len: int):
+    __slots__ = ("beam", "fft_len", "signal", "spectrum", "power_ratio", "peak_index",
+                 "frequency_peak", "power_peak", "processed")
+    def __init__(self, beam_no: int, fft_len: int, signal: np.ndarray = None):
         self.beam = beam_no
         """Beam number (0-3)"""
         self.fft_len = fft_len
         """FFT length."""
-        self.signal = np.zeros(fft_len, dtype=np.complex_)
+        if signal is None:
+            signal = np.zeros(fft_len, dtype=np.complex128)
+        self.signal = signal
         """Original signal."""
         self.spectrum = None
         """Power spectrum."""
@@ -1364,60 +1447,29 @@ class FftBeamData:
     def do_fft(self):
         """Performs FFT.
         """
-        data = self.signal
-        spectrum = np.fft.fft(data)
-        mag2 = 0
-        for i in range(self.fft_len):
-            mag = abs(spectrum[i])
-            mag2 += mag*mag
-
-        self.spectrum = np.zeros(self.fft_len, dtype=np.float)
-        half = int(self.fft_len/2)
-        for i in range(half):
-            k = i + half
-            self.spectrum[k] = _normalize(spectrum[i], mag2)
-            self.spectrum[i] = _normalize(spectrum[k], mag2)
-
-        self.power_ratio = np.zeros(self.fft_len, dtype=np.float)
+        self.spectrum = _power_spectrum(np.fft.fft(self.signal))
+        self.power_ratio = np.zeros(self.fft_len, dtype=np.float64)
         self._calc_power()
         self.processed = True
 
     def _calc_power(self):
-        max_spectrum = 0
-        for i in range(self.fft_len):
-            value = self.spectrum[i]
-            if value > max_spectrum:
-                max_spectrum = value
-                self.peak_index = i
-            if value == 0:
-                self.power_ratio[i] = -50
-            else:
-                self.power_ratio[i] = 10 * np.log10(np.absolute(value))
+        spectrum = self.spectrum
+        peak_index = int(np.argmax(spectrum))
+        if spectrum[peak_index] > 0:
+            self.peak_index = peak_index
+        nonzero = spectrum != 0
+        self.power_ratio.fill(-50)
+        np.log10(np.absolute(spectrum), out=self.power_ratio, where=nonzero)
+        np.multiply(self.power_ratio, 10, out=self.power_ratio, where=nonzero)
         self.power_peak = self.power_ratio[self.peak_index]
 
     def average(self, beam_data, count: int):
         """Averages FFT data in a beam.
         """
         if self.processed:
-            if count == 0:
-                for i in range(self.fft_len):
-                    self.spectrum[i] = beam_data.spectrum[i]
-            else:
-                for i in range(self.fft_len):
-                    value = self.spectrum[i] * count + beam_data.spectrum[i]
-                    self.spectrum[i] = value / (count + 1)
+            self.spectrum = (self.spectrum * count + beam_data.spectrum) / (count + 1)
             self._calc_power()
 
-def _normalize(value, mag: float) ->float:
-    """Normalizes FFT.
-    """
-    norm = 0
-    if mag > 0:
-        avalue = abs(value)
-        rnorm = avalue * avalue / mag
-        norm = rnorm
-    return norm
-
 class SystemInfoIdType(Enum):
     """Enumerated type class that defines system info IDs.  Used with list of settings for display.
     """
@@ -1571,3 +1623,135 @@ class DataIdType(Enum):
     """Number of built in tests."""
     BIT_CODE = auto()
     """Built in test code."""
+
+class AverageModeType(Enum):
+    """Enumerated type class that defines spectrum averaging modes.
+    """
+    CUMULATIVE = 0
+    """Arithmetic mean of all spectra."""
+    EXPONENTIAL = auto()
+    """Exponential moving average."""
+    MIN_HOLD = auto()
+    """Minimum of all spectra."""
+    MAX_HOLD = auto()
+    """Maximum of all spectra."""
+
+class SpectrumAverager:
+    """Class that averages power spectra bin by bin.
+
+    Mean and variance are updated with Welford's algorithm (cumulative mode) or
+    exponentially weighted (exponential mode), minimum and maximum are always kept.
+
+    Parameters
+    ----------
+    mode : AverageModeType
+        Defines which statistic is returned by value.
+    alpha : float
+        Weight of new spectrum in exponential mode (0-1).
+    """
+    __slots__ = ("mode", "alpha", "count", "mean", "minimum", "maximum", "_m2")
+    def __init__(self, mode: AverageModeType = AverageModeType.CUMULATIVE, alpha: float = 0.1):
+        self.mode = mode
+        """Averaging mode."""
+        self.alpha = alpha
+        """Weight of new spectrum in exponential mode."""
+        self.count = 0
+        """Number of averaged spectra."""
+        self.mean = None
+        """Mean spectrum."""
+        self.minimum = None
+        """Minimum spectrum."""
+        self.maximum = None
+        """Maximum spectrum."""
+        self._m2 = None
+
+    def reset(self):
+        """Discards all averaged spectra.
+        """
+        self.count = 0
+        self.mean = None
+        self.minimum = None
+        self.maximum = None
+        self._m2 = None
+
+    def update(self, spectrum: np.ndarray) -> np.ndarray:
+        """Adds spectrum to the average.
+
+        Parameters
+        ----------
+        spectrum : numpy.ndarray
+            Power spectrum, or spectra of several beams as rows of 2-D array.
+
+        Returns
+        -------
+        numpy.ndarray
+            Averaged spectrum for the selected mode.
+        """
+        spectrum = np.asarray(spectrum, dtype=np.float64)
+        self.count += 1
+        if self.count == 1:
+            self.mean = spectrum.copy()
+            self.minimum = spectrum.copy()
+            self.maximum = spectrum.copy()
+            self._m2 = np.zeros_like(spectrum)
+            return self.value
+
+        delta = spectrum - self.mean
+        if self.mode == AverageModeType.EXPONENTIAL:
+            increment = self.alpha * delta
+            self.mean += increment
+            self._m2 += delta * increment
+            self._m2 *= 1 - self.alpha
+        else:
+            self.mean += delta / self.count
+            self._m2 += delta * (spectrum - self.mean)
+        np.minimum(self.minimum, spectrum, out=self.minimum)
+        np.maximum(self.maximum, spectrum, out=self.maximum)
+        return self.value
+
+    @property
+    def value(self) -> np.ndarray:
+        """Averaged spectrum for the selected mode."""
+        if self.mode == AverageModeType.MIN_HOLD:
+            return self.minimum
+        if self.mode == AverageModeType.MAX_HOLD:
+            return self.maximum
+        return self.mean
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Variance of each bin."""
+        if self.count == 0:
+            return None
+        if self.mode == AverageModeType.EXPONENTIAL:
+            return self._m2.copy()
+        return self._m2 / self.count
+
+_XDATA = {}
+"""Frequency axes of FFT data keyed by (system_freq, bandwidth, fft_len)."""
+
+def _frequency_axis(system_freq: int, bandwidth: int, fft_len: int) ->np.ndarray:
+    """Returns read-only frequency axis in kHz relative to system frequency.
+    """
+    key = (system_freq, bandwidth, fft_len)
+    xdata = _XDATA.get(key)
+    if xdata is None:
+        freq_khz = system_freq * 0.001
+        if bandwidth == 1:
+            freq_khz /= 4.0
+        freqband = freq_khz/fft_len
+        xdata = np.arange(fft_len, dtype=np.float64) * freqband - freq_khz / 2
+        xdata.flags.writeable = False
+        _XDATA[key] = xdata
+    return xdata
+
+def _power_spectrum(spectrum: np.ndarray) ->np.ndarray:
+    """Returns normalized power spectrum with zero frequency in the center.
+
+    Spectra of several beams can be passed as rows of 2-D array.
+    """
+    mag2 = np.abs(spectrum) ** 2
+    total = mag2.sum(axis=-1, keepdims=True)
+    power = np.zeros_like(mag2)
+    np.divide(mag2, total, out=power, where=total > 0)
+    return np.fft.fftshift(power, axes=-1)
@@ -3,9 +3,13 @@
 import math
 import threading
 import datetime
+import os
 import os.path
+import select
+from collections import deque
+from queue import Empty
 from threading import Thread
-from time import sleep
+from time import sleep, perf_counter
 import serial
 
 class Setting:
@@ -65,7 +69,8 @@ class SerialPort():
         Baud-rate to use when opening the port.
     """
     #pylint: disable=too-many-instance-attributes
-    _THREAD_DELAY = 0.01
+    _READ_TIMEOUT = 0.1
+    _RX_BUFFER_SIZE = 4096
 
     def __init__(self, com="COM1", baud_rate=115200):
         self.com = com
@@ -78,7 +83,9 @@ class SerialPort():
         self._receive_callback = []
         self._run = False
         self._thread = None
-        self._lock = threading.Lock()
+        self._writer_thread = None
+        self._write_queue = BoundedQueue(0, 0)
+        self._rx_view = memoryview(bytearray(SerialPort._RX_BUFFER_SIZE))
 
     def __enter__(self):
         """Opens port on enter.
@@ -88,9 +95,13 @@ class SerialPort():
             com = self.com
             if com.startswith("COM"):
                 com = "\\\\.\\"+ com
-            self._port = serial.Serial(com, self.baudrate)
-            self._port.setDTR(True)
-            self._port.setRTS(True)
+            self._port = serial.Serial(com, self.baudrate, timeout=SerialPort._READ_TIMEOUT)
+            try:
+                self._port.setDTR(True)
+                self._port.setRTS(True)
+            except OSError:
+                # Virtual ports (pseudo terminals) have no modem control lines
+                pass
             self._port.writeTimeout = 1
 
         except serial.SerialException:
@@ -98,9 +109,14 @@ class SerialPort():
 
         if (self._port is not None) and self._port.isOpen() and not self._run:
             self._run = True
+            self._write_queue.clear()
             self._thread = Thread(target=self._receive_listener, name="Wayfinder serial thread")
             self._thread.daemon = True
             self._thread.start()
+            self._writer_thread = Thread(target=self._write_listener,
+                                         name="Wayfinder serial writer thread")
+            self._writer_thread.daemon = True
+            self._writer_thread.start()
         else:
             self._port = None
 
@@ -144,29 +160,53 @@ class SerialPort():
         """
         if self._run:
             self._run = False
+            # Wake up writer, it finishes writes queued before close
+            self._write_queue.put(None)
+            self._writer_thread.join(2)
+            try:
+                self._port.cancel_read()
+            except (AttributeError, serial.SerialException, OSError):
+                pass
             self._thread.join(2)
         if self._port is not None and self._port.isOpen():
             self._port.close()
             self.serial_port = None
 
     def write(self, array: bytearray):
-        """Writes byte array to port.
+        """Queues byte array for writing to port, does not block.
+
+        Data are written by writer thread in the order of calls.
 
         Parameters
         ----------
         array : byte array
             The byte array to be written to serial port.
         """
-        if self._port is not None and self._port.isOpen():
-            with self._lock:
-                try:
-                    self._port.write(array)
-                except serial.SerialException:
-                    pass
+        if self._run:
+            self._write_queue.put(bytes(array), len(array))
+
+    def _write_listener(self):
+        """Thread function that writes queued byte arrays to port.
+        """
+        while True:
+            arr = self._write_queue.get()
+            if arr is None:
+                if not self._run:
+                    break
+                continue
+            try:
+                self._port.write(arr)
+            except (serial.SerialException, OSError):
+                pass
 
     def register_receive_callback(self, function):
         """Registers receive callback function.
 
+        The function is called with a bytes-like object.  On POSIX systems it is
+        a memoryview of the receive buffer, which is reused for the next read, so
+        data are valid only during the call; the function must copy data it
+        wants to keep.
+
         Parameters
         ----------
         function
@@ -182,18 +222,59 @@ class SerialPort():
     def _receive_listener(self):
         """Thread function that reads bytes from port.
         """
+        read = self._read_into if os.name == "posix" else self._read
         while self._run:
-            if self._port.isOpen():
-                bytes_to_read = self._port.inWaiting()
-                if bytes_to_read > 0:
-                    with self._lock:
-                        arr = self._port.read_all()
-                    if self._run and len(arr) > 0:
-                        for func in self._receive_callback:
-                            func(arr)
-            sleep(SerialPort._THREAD_DELAY)
+            try:
+                data = read()
+            except (serial.SerialException, OSError, TypeError):
+                if self._run:
+                    sleep(SerialPort._READ_TIMEOUT)
+                continue
+            if self._run and data:
+                for func in self._receive_callback:
+                    func(data)
         #print("Finished serial thread")
 
+    def _read_into(self) -> memoryview:
+        """Waits for data (or read timeout) and reads everything that is waiting
+        into the receive buffer with a single readv() call, without allocating
+        new buffers.
+
+        Returns
+        -------
+        memoryview
+            Part of the receive buffer that was filled, empty if nothing was read.
+        """
+        view = self._rx_view
+        abort_fd = self._port.pipe_abort_read_r
+        (ready, _, _) = select.select([self._port.fd, abort_fd], [], [],
+                                      SerialPort._READ_TIMEOUT)
+        if abort_fd in ready:
+            # Woken up by cancel_read() from close()
+            os.read(abort_fd, 1000)
+            return view[:0]
+        if not ready:
+            return view[:0]
+        try:
+            count = os.readv(self._port.fd, [view])
+        except BlockingIOError:
+            return view[:0]
+        if count == 0:
+            # Disconnected devices are always ready to read but return nothing
+            raise serial.SerialException("device disconnected")
+        return view[:count]
+
+    def _read(self) -> bytes:
+        """Blocks until at least one byte arrives (or read timeout expires),
+        then reads whatever else is already waiting.
+        """
+        arr = self._port.read(1)
+        if len(arr) > 0:
+            bytes_to_read = self._port.in_waiting
+            if bytes_to_read > 0:
+                arr += self._port.read(bytes_to_read)
+        return arr
+
     def set_baudrate(self, baud_rate: int) -> bool:
         """Changes baud-rate of the open port.
 
@@ -323,6 +404,290 @@ class DataLogger():
                 self._log_file.flush()
             except ValueError:
                 pass
+
+class BoundedQueue():
+    """Thread safe FIFO queue bounded by number of items and their total size.
+
+    When a new item does not fit, either the oldest items are dropped to make
+    room for it or the new item is dropped.  Dropped items are counted.
+
+    Parameters
+    ----------
+    max_items : int
+        Maximum number of items, 0 for no limit.
+    max_bytes : int
+        Maximum total size of items in bytes, 0 for no limit.
+    drop_oldest : bool
+        If True oldest items are dropped when queue is full, otherwise new item is dropped.
+    """
+    def __init__(self, max_items: int = 1000, max_bytes: int = 0, drop_oldest: bool = True):
+        self.max_items = max_items
+        """Maximum number of items, 0 for no limit."""
+        self.max_bytes = max_bytes
+        """Maximum total size of items in bytes, 0 for no limit."""
+        self.drop_oldest = drop_oldest
+        """Defines if oldest or newest item is dropped when queue is full."""
+        self.dropped_items = 0
+        """Number of dropped items."""
+        self.dropped_bytes = 0
+        """Total size of dropped items."""
+        self.max_depth = 0
+        """Highest number of items that were in queue."""
+        self._items = deque()
+        self._bytes = 0
+        self._closed = False
+        self._not_empty = threading.Condition(threading.Lock())
+
+    def configure(self, max_items: int, max_bytes: int, drop_oldest: bool):
+        """Changes limits, oldest items are dropped if queue exceeds new limits.
+        """
+        with self._not_empty:
+            self.max_items = max_items
+            self.max_bytes = max_bytes
+            self.drop_oldest = drop_oldest
+            while (self.max_items > 0 and len(self._items) > self.max_items) or \
+                  (self.max_bytes > 0 and self._bytes > self.max_bytes):
+                self._drop_oldest()
+
+    def put(self, item, size: int = 0) -> bool:
+        """Puts item into queue without blocking.
+
+        Parameters
+        ----------
+        item : object
+            Item to put.
+        size : int
+            Size of the item in bytes.
+
+        Returns
+        -------
+        bool
+            True if item was put, False if it was dropped.
+        """
+        with self._not_empty:
+            if (self.max_bytes > 0 and size > self.max_bytes) or \
+               (not self.drop_oldest and self._is_full(size)):
+                self.dropped_items += 1
+                self.dropped_bytes += size
+                return False
+            while self._items and self._is_full(size):
+                self._drop_oldest()
+            self._items.append((item, size))
+            self._bytes += size
+            if len(self._items) > self.max_depth:
+                self.max_depth = len(self._items)
+            self._not_empty.notify()
+            return True
+
+    def get(self, block: bool = True, timeout: float = None):
+        """Removes and returns item from queue, raises queue.Empty if there is none.
+
+        Parameters
+        ----------
+        block : bool
+            If True waits for an item.  Closed queue does not wait.
+        timeout : float
+            Maximum time to wait in seconds, None waits forever.
+        """
+        with self._not_empty:
+            if block:
+                if not self._not_empty.wait_for(lambda: self._items or self._closed, timeout) \
+                   or not self._items:
+                    raise Empty
+            elif not self._items:
+                raise Empty
+            (item, size) = self._items.popleft()
+            self._bytes -= size
+            return item
+
+    def get_nowait(self):
+        """Removes and returns item from queue without blocking.
+        """
+        return self.get(False)
+
+    def close(self):
+        """Wakes up all waiting consumers, get does not wait until reopen is called.
+        """
+        with self._not_empty:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    def reopen(self):
+        """Lets get wait for items again after close.
+        """
+        with self._not_empty:
+            self._closed = False
+
+    def clear(self) -> int:
+        """Removes all items from queue, returns number of removed items.
+        """
+        with self._not_empty:
+            count = len(self._items)
+            self._items.clear()
+            self._bytes = 0
+            return count
+
+    def qsize(self) -> int:
+        """Returns number of items in queue.
+        """
+        return len(self._items)
+
+    def empty(self) -> bool:
+        """Returns True if queue is empty.
+        """
+        return not self._items
+
+    @property
+    def num_bytes(self) -> int:
+        """Total size of items in queue."""
+        return self._bytes
+
+    def get_stats(self) -> dict:
+        """Returns dictionary with queue size, limits and drop counters.
+        """
+        with self._not_empty:
+            return {"items": len(self._items), "bytes": self._bytes,
+                    "max_items": self.max_items, "max_bytes": self.max_bytes,
+                    "drop_oldest": self.drop_oldest, "dropped_items": self.dropped_items,
+                    "dropped_bytes": self.dropped_bytes, "max_depth": self.max_depth}
+
+    def reset_counters(self):
+        """Resets drop counters and maximum depth.
+        """
+        with self._not_empty:
+            self.dropped_items = 0
+            self.dropped_bytes = 0
+            self.max_depth = len(self._items)
+
+    def _is_full(self, size: int) -> bool:
+        return (self.max_items > 0 and len(self._items) >= self.max_items) or \
+            (self.max_bytes > 0 and self._bytes + size > self.max_bytes)
+
+    def _drop_oldest(self):
+        (_, size) = self._items.popleft()
+        self._bytes -= size
+        self.dropped_items += 1
+        self.dropped_bytes += size
+
+class PipelineStage():
+    """Stage of a processing pipeline: worker threads that take items from a
+    bounded queue and pass them to a function.
+
+    Items that do not fit into the queue are dropped (overruns), see BoundedQueue.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, used for thread names.
+    function
+        Function called with each item.
+    workers : int
+        Number of worker threads.  With more than one worker items may be
+        processed out of order.
+    max_items : int
+        Maximum number of queued items, 0 for no limit.
+    max_bytes : int
+        Maximum total size of queued items in bytes, 0 for no limit.
+    drop_oldest : bool
+        If True oldest items are dropped when queue is full, otherwise new item is dropped.
+    """
+    #pylint: disable=too-many-arguments
+    def __init__(self, name: str, function, workers: int = 1, max_items: int = 1000,
+                 max_bytes: int = 0, drop_oldest: bool = True):
+        self.name = name
+        """Name of the stage."""
+        self.processed = 0
+        """Number of processed items."""
+        self.errors = 0
+        """Number of items for which function raised exception."""
+        self.busy_time = 0.0
+        """Total time spent in function in seconds."""
+        self.max_time = 0.0
+        """Longest time spent in function for one item in seconds."""
+        self._function = function
+        self._workers = workers
+        self._queue = BoundedQueue(max_items, max_bytes, drop_oldest)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts worker threads.
+        """
+        if self._threads:
+            return
+        self._queue.reopen()
+        for i in range(self._workers):
+            thread = Thread(target=self._worker, name="{0} {1}".format(self.name, i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 2):
+        """Stops worker threads after queued items are processed.
+        """
+        self._queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def is_running(self) -> bool:
+        """Returns True if worker threads are running.
+        """
+        return bool(self._threads)
+
+    def put(self, item, size: int = 0) -> bool:
+        """Queues item for processing, does not block.
+
+        Returns
+        -------
+        bool
+            True if item was queued, False if it was dropped.
+        """
+        return self._queue.put(item, size)
+
+    def get_stats(self) -> dict:
+        """Returns queue statistics (depth, overruns) and processing statistics.
+        """
+        stats = self._queue.get_stats()
+        stats["overruns"] = stats["dropped_items"]
+        with self._lock:
+            stats.update({"processed": self.processed, "errors": self.errors,
+                          "busy_time": self.busy_time, "max_time": self.max_time})
+        return stats
+
+    def reset_counters(self):
+        """Resets overrun and processing counters.
+        """
+        self._queue.reset_counters()
+        with self._lock:
+            self.processed = 0
+            self.errors = 0
+            self.busy_time = 0.0
+            self.max_time = 0.0
+
+    #pylint: disable=broad-except
+    def _worker(self):
+        """Thread function that processes queued items.
+        """
+        while True:
+            try:
+                item = self._queue.get()
+            except Empty:
+                break
+            start = perf_counter()
+            failed = False
+            try:
+                self._function(item)
+            except Exception as exception:
+                failed = True
+                print("Exception in {0}: {1}".format(self.name, exception))
+            elapsed = perf_counter() - start
+            with self._lock:
+                self.processed += 1
+                self.errors += failed
+                self.busy_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+
 def print_bytes(array: bytearray) -> str:
     """Outputs byte array and formats for pretty print.
 
@@ -0,0 +1,32 @@
+"""Example usage for asyncio DVL driver
+"""
+import asyncio
+from dvl.async_dvl import AsyncDvl
+
+async def main(port: str):
+    """Prints setup and time of 10 pings
+    """
+    async with AsyncDvl() as dvl:
+        if not await dvl.connect(port, 115200):
+            print("Failed to connect")
+            return
+
+        # Get user system setup
+        if await dvl.get_setup():
+            print(dvl.system_setup)
+
+        # Start pinging and print data
+        if not await dvl.exit_command_mode():
+            print("Failed to start pinging")
+        count = 0
+        async for output_data in dvl.iter_output_data():
+            txt = output_data.get_date_time().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+            print("Got data {0}".format(txt))
+            count += 1
+            if count == 10:
+                break
+
+if __name__ == "__main__":
+    PORT = input("Please enter your port number (e.g. '1' for COM1) =  ")
+    PORT = "COM" + PORT
+    asyncio.run(main(PORT))
@@ -9,7 +9,7 @@ setup(
     author_email="rdifs@teledyne.com",
     url="http://www.teledynemarine.com/rdi/",
     packages=find_packages(),
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     install_requires=[
         "pyserial",
         "numpy"